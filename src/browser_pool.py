@@ -0,0 +1,342 @@
+"""
+MEGANX Browser Pool
+===================
+Async Playwright engine with a bounded pool of browser contexts.
+
+Every browser tool leases a page from the pool for the duration of one call
+and hands it back afterwards, so concurrent tool calls no longer serialize on
+a single global page or block the server's event loop.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Any
+from urllib.parse import urlsplit
+
+import startup_profile
+from env_config import env_int, env_float, env_bool, env_list
+from http_cache import http_cache, DiskResponseCache
+from dom_extraction import MUTATION_COUNTER_JS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Page load milestones accepted by page.goto(wait_until=...)
+WAIT_UNTIL_CHOICES = ("commit", "domcontentloaded", "load", "networkidle")
+
+# Ad/analytics hosts dropped in lean mode (subdomains included)
+DEFAULT_BLOCKED_DOMAINS = (
+    "doubleclick.net,googlesyndication.com,google-analytics.com,googletagmanager.com,"
+    "googleadservices.com,facebook.net,connect.facebook.net,hotjar.com,scorecardresearch.com,"
+    "adnxs.com,criteo.com,taboola.com,outbrain.com"
+)
+
+
+class PoolConfig:
+    """
+    Browser pool settings.
+    Defaults come from the environment (see .env.example).
+    """
+
+    def __init__(
+        self,
+        max_contexts: Optional[int] = None,
+        prewarm: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        max_uses: Optional[int] = None,
+        session_idle_timeout: Optional[float] = None,
+        headless: Optional[bool] = None,
+        lean: Optional[bool] = None,
+        wait_until: Optional[str] = None,
+    ):
+        self.max_contexts = max_contexts or env_int("BROWSER_POOL_SIZE", 4)
+        self.prewarm = prewarm if prewarm is not None else env_int("BROWSER_POOL_PREWARM", 1)
+        self.idle_timeout = idle_timeout or env_float("BROWSER_POOL_IDLE_TIMEOUT", 300.0)
+        self.max_uses = max_uses or env_int("BROWSER_POOL_MAX_USES", 50)
+        self.session_idle_timeout = session_idle_timeout or env_float("BROWSER_SESSION_IDLE_TIMEOUT", 900.0)
+        self.headless = headless if headless is not None else env_bool("PLAYWRIGHT_HEADLESS", True)
+        # Lean browsing: drop heavy resources and trackers before they hit the network
+        self.lean = lean if lean is not None else env_bool("BROWSER_LEAN", True)
+        self.blocked_resource_types = set(env_list("BROWSER_BLOCK_RESOURCES", "image,media,font"))
+        self.blocked_domains = tuple(env_list("BROWSER_BLOCK_DOMAINS", DEFAULT_BLOCKED_DOMAINS))
+        self.wait_until = wait_until or os.getenv("BROWSER_WAIT_UNTIL", "domcontentloaded")
+        if self.wait_until not in WAIT_UNTIL_CHOICES:
+            self.wait_until = "domcontentloaded"
+
+
+class PoolExhausted(RuntimeError):
+    """Raised when a lease needs a context but every one is pinned by a session."""
+
+
+# ============================================================================
+# POOLED PAGE
+# ============================================================================
+
+class PooledPage:
+    """A browser context with its single page, plus bookkeeping for reuse."""
+
+    def __init__(self, context, page, pin: Optional[str] = None):
+        self.context = context
+        self.page = page
+        self.pin = pin
+        self.uses = 0
+        self.created_at = time.time()
+        self.last_used = time.time()
+        self.lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        """Close the underlying context (and its page)."""
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+
+# ============================================================================
+# BROWSER POOL
+# ============================================================================
+
+class BrowserPool:
+    """
+    Bounded pool of pre-created BrowserContexts sharing one Chromium process.
+
+    - Anonymous leases get any free context and return it to the free list.
+    - Pinned leases (named sessions, including the "default" tab used by
+      tools called without a session_id) keep their context across calls, so
+      navigate -> click -> extract still sees the same page. Calls on the same
+      session serialize; different sessions run concurrently.
+    - Free contexts idle longer than `idle_timeout` are closed, and a context
+      that has served `max_uses` leases is recycled instead of reused.
+    - Sessions idle longer than `session_idle_timeout` are reaped.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None, response_cache: Optional[DiskResponseCache] = None):
+        self.config = config or PoolConfig()
+        self.response_cache = response_cache
+        self._playwright = None
+        self._browser = None
+        self._free: List[PooledPage] = []
+        self._pinned: Dict[str, PooledPage] = {}
+        self._leased = 0
+        self._blocked_requests = 0
+        self._start_lock = asyncio.Lock()
+        self._cond = asyncio.Condition()
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    def total_contexts(self) -> int:
+        """Contexts currently open (free + leased anonymous + pinned)."""
+        return len(self._free) + self._leased + len(self._pinned)
+
+    async def start(self) -> None:
+        """Launch Chromium and pre-create contexts. Safe to call repeatedly."""
+        if self.started:
+            return
+        async with self._start_lock:
+            if self.started:
+                return
+            with startup_profile.timed("playwright import"):
+                from playwright.async_api import async_playwright
+            with startup_profile.timed("chromium launch"):
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.config.headless)
+            for _ in range(min(self.config.prewarm, self.config.max_contexts)):
+                self._free.append(await self._new_slot())
+
+    async def close(self) -> None:
+        """Close every context and shut down Chromium."""
+        for slot in self._free + list(self._pinned.values()):
+            await slot.close()
+        self._free.clear()
+        self._pinned.clear()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+
+    async def _new_slot(self, pin: Optional[str] = None) -> PooledPage:
+        """Create a fresh context + page."""
+        context = await self._browser.new_context()
+        await context.add_init_script(MUTATION_COUNTER_JS)
+        if self.config.lean or self.response_cache:
+            await context.route("**/*", self._route)
+        page = await context.new_page()
+        return PooledPage(context, page, pin=pin)
+
+    def _is_blocked(self, resource_type: str, url: str) -> bool:
+        """Lean mode filter: blocked resource type or blocked (sub)domain."""
+        if resource_type in self.config.blocked_resource_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        return any(host == d or host.endswith("." + d) for d in self.config.blocked_domains)
+
+    async def _route(self, route) -> None:
+        """Request interception: lean-mode blocking, then the disk response cache."""
+        request = route.request
+        if self.config.lean and self._is_blocked(request.resource_type, request.url):
+            await route.abort("blockedbyclient")
+            self._blocked_requests += 1
+        elif self.response_cache and request.method == "GET" and request.url.startswith("http"):
+            await self.response_cache.handle(route)
+        else:
+            await route.continue_()
+
+    async def _evict_idle(self) -> None:
+        """Close free contexts and sessions that have been idle for too long."""
+        now = time.time()
+        keep, stale = [], []
+        for slot in self._free:
+            (stale if now - slot.last_used > self.config.idle_timeout else keep).append(slot)
+        self._free = keep
+        for pin, slot in list(self._pinned.items()):
+            if not slot.lock.locked() and now - slot.last_used > self.config.session_idle_timeout:
+                del self._pinned[pin]
+                stale.append(slot)
+        for slot in stale:
+            await slot.close()
+        if stale:
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------------
+    # LEASING
+    # ------------------------------------------------------------------------
+
+    async def _acquire(self, pin: Optional[str]) -> PooledPage:
+        """Take a context out of the pool, creating one if capacity allows."""
+        await self.start()
+        async with self._cond:
+            await self._evict_idle()
+            while True:
+                if pin is not None and pin in self._pinned:
+                    return self._pinned[pin]
+                if pin is None and self._free:
+                    slot = self._free.pop()
+                    break
+                if pin is not None and self._free and self.total_contexts() >= self.config.max_contexts:
+                    # Sessions never reuse a leased context (its storage and page
+                    # belong to an earlier caller): trade a free one for a fresh one
+                    await self._free.pop().close()
+                if self.total_contexts() < self.config.max_contexts:
+                    slot = await self._new_slot()
+                    break
+                if self._leased == 0:
+                    # Only sessions hold the pool; nothing will come back, for
+                    # a session or an anonymous lease.
+                    raise PoolExhausted(
+                        f"All {self.config.max_contexts} browser contexts are held by sessions. "
+                        "Close a session first."
+                    )
+                await self._cond.wait()
+            if pin is None:
+                self._leased += 1
+            else:
+                slot.pin = pin
+                self._pinned[pin] = slot
+            return slot
+
+    async def _release(self, slot: PooledPage, recycle: bool = False) -> None:
+        """
+        Return an anonymous lease to the free list, or close it if it is worn
+        out or `recycle` (the lease failed, so its page may be mid-navigation).
+        """
+        async with self._cond:
+            self._leased -= 1
+            if recycle or slot.uses >= self.config.max_uses:
+                await slot.close()
+            else:
+                self._free.append(slot)
+            self._cond.notify()
+
+    @asynccontextmanager
+    async def lease(self, pin: Optional[str] = None):
+        """
+        Lease a page for the duration of the `async with` block.
+
+        With `pin`, the same context is handed back on every lease for that
+        pin and calls on it are serialized.
+        """
+        slot = await self._acquire(pin)
+        failed = True
+        try:
+            async with slot.lock:
+                slot.uses += 1
+                slot.last_used = time.time()
+                try:
+                    yield slot.page
+                    failed = False
+                finally:
+                    slot.last_used = time.time()
+        finally:
+            # Anonymous leases always go back, even when the body raised or was cancelled
+            if pin is None:
+                await self._release(slot, recycle=failed)
+
+    def current_url(self, pin: str) -> Optional[str]:
+        """URL of a pinned tab without leasing it (None if it doesn't exist yet)."""
+        slot = self._pinned.get(pin)
+        return slot.page.url if slot else None
+
+    # ------------------------------------------------------------------------
+    # SESSIONS
+    # ------------------------------------------------------------------------
+
+    async def open_session(self, session_id: Optional[str] = None) -> str:
+        """Create (or touch) a named session and return its id."""
+        session_id = session_id or uuid.uuid4().hex[:8]
+        async with self.lease(session_id):
+            pass
+        return session_id
+
+    async def close_session(self, session_id: str) -> bool:
+        """Close a named session. Returns False if it does not exist."""
+        async with self._cond:
+            slot = self._pinned.pop(session_id, None)
+            if slot is None:
+                return False
+            self._cond.notify_all()
+        async with slot.lock:
+            await slot.close()
+        return True
+
+    async def list_sessions(self) -> List[Dict[str, Any]]:
+        """Describe open sessions (reaping idle ones first)."""
+        async with self._cond:
+            await self._evict_idle()
+        now = time.time()
+        return [
+            {
+                "session_id": pin,
+                "url": slot.page.url,
+                "uses": slot.uses,
+                "idle_seconds": round(now - slot.last_used, 1),
+                "busy": slot.lock.locked(),
+            }
+            for pin, slot in self._pinned.items()
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        return {
+            "started": self.started,
+            "max_contexts": self.config.max_contexts,
+            "free": len(self._free),
+            "leased": self._leased,
+            "pinned": len(self._pinned),
+            "lean": self.config.lean,
+            "blocked_requests": self._blocked_requests,
+        }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+browser_pool = BrowserPool(response_cache=http_cache)
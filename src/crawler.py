@@ -0,0 +1,137 @@
+"""
+MEGANX Crawler
+==============
+Single-page fetch (HTTP fast path -> Playwright fallback) and a parallel
+multi-URL crawl with global and per-host concurrency limits.
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional, Dict, List, Any, Callable, Awaitable
+from urllib.parse import urlsplit
+
+from env_config import env_int, env_float
+from browser_pool import browser_pool
+from dom_extraction import extract_many
+from fast_fetch import fast_fetcher
+
+RENDER_CHOICES = ("auto", "static", "browser")
+
+
+class CrawlConfig:
+    """Crawl limits. Defaults come from the environment (see .env.example)."""
+
+    def __init__(self):
+        self.max_urls = env_int("BROWSER_CRAWL_MAX_URLS", 50)
+        self.max_concurrency = env_int("BROWSER_CRAWL_CONCURRENCY", 4)
+        self.per_host = env_int("BROWSER_CRAWL_PER_HOST", 2)
+        self.timeout = env_float("BROWSER_CRAWL_TIMEOUT", 30.0)
+
+
+crawl_config = CrawlConfig()
+
+
+# ============================================================================
+# SINGLE PAGE
+# ============================================================================
+
+async def fetch_page(url: str, selectors: Optional[List[str]] = None, render: str = "auto") -> Dict[str, Any]:
+    """
+    Fetch one page. `auto` tries plain HTTP first and escalates to a pooled
+    Playwright page when the result needs JavaScript; `static` never launches
+    the browser; `browser` always does.
+    """
+    if render not in RENDER_CHOICES:
+        raise ValueError(f"render must be one of {', '.join(RENDER_CHOICES)}")
+
+    if render != "browser":
+        try:
+            result = await fast_fetcher.fetch(url, selectors)
+        except Exception:
+            if render == "static":
+                raise
+        else:
+            escalate = result.pop("escalate")
+            if render == "static" or not escalate:
+                return result
+
+    try:
+        # The browser path has no deadline of its own (a hung page would hang the tool call)
+        return await asyncio.wait_for(_render(url, selectors), fast_fetcher.timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Browser render timed out after {fast_fetcher.timeout}s") from None
+
+
+async def _render(url: str, selectors: Optional[List[str]]) -> Dict[str, Any]:
+    """Fetch one page in a pooled Playwright page."""
+    async with browser_pool.lease() as page:
+        response = await page.goto(url, wait_until=browser_pool.config.wait_until)
+        result = {"url": page.url, "engine": "playwright", "title": await page.title()}
+        # goto returns None for same-document navigations (no HTTP response)
+        if response is not None:
+            result["status"] = response.status
+        if selectors:
+            result.update(await extract_many(page, selectors))
+        else:
+            text = await page.inner_text("body", timeout=5000)
+            result["text"] = " ".join(text.split())[: fast_fetcher.max_chars]
+        return result
+
+
+# ============================================================================
+# MULTI-URL CRAWL
+# ============================================================================
+
+async def crawl(
+    urls: List[str],
+    selectors: Optional[List[str]] = None,
+    max_concurrency: Optional[int] = None,
+    render: str = "auto",
+    timeout: Optional[float] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch many URLs in parallel. Each URL gets its own timeout and failures
+    are reported per URL, so one slow or broken site never sinks the batch.
+    `on_result` is awaited as each URL finishes (completion order).
+    """
+    urls = list(dict.fromkeys(urls))
+    timeout = timeout or crawl_config.timeout
+    global_limit = asyncio.Semaphore(max(1, min(max_concurrency or crawl_config.max_concurrency,
+                                                browser_pool.config.max_contexts * 4)))
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def crawl_one(url: str) -> Dict[str, Any]:
+        host = urlsplit(url).hostname or ""
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(max(1, crawl_config.per_host)))
+        started = time.perf_counter()
+        # Host slot first, so a busy host never parks a global slot
+        async with host_limit, global_limit:
+            try:
+                result = await asyncio.wait_for(fetch_page(url, selectors, render), timeout)
+                result["ok"] = result.get("status", 200) < 400
+            except asyncio.TimeoutError:
+                result = {"url": url, "ok": False, "error": f"Timed out after {timeout}s"}
+            except Exception as e:
+                result = {"url": url, "ok": False, "error": str(e)}
+        result["requested_url"] = url
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+        return result
+
+    results = []
+    for finished in asyncio.as_completed([crawl_one(url) for url in urls]):
+        result = await finished
+        results.append(result)
+        if on_result:
+            await on_result(result)
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> str:
+    """JSON payload for the crawl tool: counts plus per-URL results."""
+    ok = sum(1 for r in results if r.get("ok"))
+    return json.dumps(
+        {"total": len(results), "ok": ok, "failed": len(results) - ok, "results": results},
+        ensure_ascii=False,
+    )
@@ -0,0 +1,293 @@
+"""
+MEGANX DOM Extraction
+=====================
+In-page scripts for bulk extraction.
+
+Each script runs inside a single `page.evaluate` call, so resolving many
+selectors costs one IPC hop to Chromium instead of one per selector.
+Large readable extractions are split into token-bounded chunks that clients
+page through with a cursor, and repeated reads can return only what changed.
+"""
+
+import difflib
+import uuid
+from typing import Dict, List, Any, Optional
+
+from env_config import env_int, env_float
+from ttl_cache import TTLCache, MISS
+from text_chunking import chunk_text, normalize_whitespace
+
+# Upper bound on rows returned by one extract_rows call
+MAX_ROWS = 1000
+
+# ============================================================================
+# IN-PAGE SCRIPTS
+# ============================================================================
+
+# Init script for every context: counts DOM mutations, so cached extractions
+# of a page that its own scripts changed (client rendering, live updates) miss
+MUTATION_COUNTER_JS = """
+(() => {
+    window.__nexusMutations = 0;
+    new MutationObserver(() => { window.__nexusMutations++; }).observe(document, {
+        subtree: true, childList: true, characterData: true, attributes: true,
+    });
+})();
+"""
+
+# -> mutation count of the page, or null if the counter is not installed
+MUTATION_COUNT_JS = "() => (typeof window.__nexusMutations === 'number' ? window.__nexusMutations : null)"
+
+# selectors -> {selector: {"text": ...} | {"error": ...}}
+EXTRACT_MANY_JS = """
+(selectors) => {
+    const out = {};
+    for (const sel of selectors) {
+        try {
+            const el = document.querySelector(sel);
+            out[sel] = el ? { text: el.textContent } : { error: "No element matches selector" };
+        } catch (e) {
+            out[sel] = { error: String((e && e.message) || e) };
+        }
+    }
+    return out;
+}
+"""
+
+# {selector, fields, limit, offset} -> {"kind": "table" | "list", "total", "rows", ["columns"]}
+# Field specs are "sub-selector", "sub-selector@attr" or "@attr" (on the row itself).
+EXTRACT_ROWS_JS = """
+({ selector, fields, limit, offset }) => {
+    const clean = (s) => (s || "").replace(/\\s+/g, " ").trim();
+    const nodes = Array.from(document.querySelectorAll(selector));
+
+    if (!fields && nodes.length === 1 && nodes[0].tagName === "TABLE") {
+        const table = nodes[0];
+        const all = Array.from(table.rows);
+        let head = null;
+        if (table.tHead && table.tHead.rows.length) {
+            head = table.tHead.rows[table.tHead.rows.length - 1];
+        } else if (all.length && Array.from(all[0].cells).every((c) => c.tagName === "TH")) {
+            head = all[0];
+        }
+        const body = all.filter((r) => r !== head && !(table.tHead && table.tHead.contains(r)));
+        return {
+            kind: "table",
+            columns: head ? Array.from(head.cells).map((c) => clean(c.textContent)) : [],
+            total: body.length,
+            rows: body.slice(offset, offset + limit).map((r) => Array.from(r.cells).map((c) => clean(c.textContent))),
+        };
+    }
+
+    const pick = (root, spec) => {
+        const m = spec.match(/^(.*?)@([\\w:-]+)$/);
+        const sub = (m ? m[1] : spec).trim();
+        const el = sub ? root.querySelector(sub) : root;
+        if (!el) return null;
+        return m ? el.getAttribute(m[2]) : clean(el.textContent);
+    };
+    return {
+        kind: "list",
+        total: nodes.length,
+        rows: nodes.slice(offset, offset + limit).map((n) =>
+            fields
+                ? Object.fromEntries(Object.entries(fields).map(([k, spec]) => [k, pick(n, spec)]))
+                : clean(n.textContent)
+        ),
+    };
+}
+"""
+
+# selector -> readable text of the element (null if nothing matches).
+# Skips navigation/boilerplate landmarks, scripts and hidden nodes (headers and
+# footers only at page level: inside article/main/section they are content); emits
+# newlines around block elements and light markdown for headings/list items.
+READABLE_JS = """
+(selector) => {
+    const root = document.querySelector(selector);
+    if (!root) return null;
+    const SKIP = new Set(["NAV", "ASIDE", "SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE",
+                          "SVG", "IFRAME", "BUTTON", "CANVAS", "SELECT", "DIALOG"]);
+    const SKIP_ROLES = new Set(["navigation", "banner", "contentinfo", "complementary", "search", "dialog"]);
+    // Like the implicit banner/contentinfo roles: only page-level header/footer
+    const PAGE_LEVEL = new Set(["HEADER", "FOOTER"]);
+    const SECTIONING = "article, main, section, [role=article], [role=main]";
+    const BLOCK = /^(P|DIV|SECTION|ARTICLE|MAIN|H[1-6]|LI|UL|OL|TR|TABLE|BLOCKQUOTE|PRE|BR|DL|DD|DT|FIGCAPTION|HR)$/;
+    const out = [];
+    const walk = (node) => {
+        if (node.nodeType === Node.TEXT_NODE) { out.push(node.nodeValue); return; }
+        if (node.nodeType !== Node.ELEMENT_NODE) return;
+        const tag = node.tagName.toUpperCase();
+        if (node !== root) {
+            if (PAGE_LEVEL.has(tag) && !node.parentElement.closest(SECTIONING)) return;
+            if (SKIP.has(tag) || node.hidden || node.getAttribute("aria-hidden") === "true") return;
+            if (SKIP_ROLES.has(node.getAttribute("role"))) return;
+            const style = getComputedStyle(node);
+            if (style.display === "none" || style.visibility === "hidden") return;
+        }
+        const block = BLOCK.test(tag);
+        if (block) out.push("\\n");
+        if (/^H[1-6]$/.test(tag)) out.push("#".repeat(Number(tag[1])) + " ");
+        if (tag === "LI") out.push("- ");
+        for (const child of node.childNodes) walk(child);
+        if (tag === "TD" || tag === "TH") out.push(" | ");
+        if (block) out.push("\\n");
+    };
+    walk(root);
+    return out.join("");
+}
+"""
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+async def extract_many(page, selectors: List[str]) -> Dict[str, Any]:
+    """
+    Resolve every selector in one in-page evaluation.
+    Returns {"results": {selector: text}, "errors": {selector: message}}.
+    """
+    raw = await page.evaluate(EXTRACT_MANY_JS, list(dict.fromkeys(selectors)))
+    results, errors = {}, {}
+    for selector, item in raw.items():
+        if "error" in item:
+            errors[selector] = item["error"]
+        else:
+            results[selector] = item["text"]
+    return {"results": results, "errors": errors}
+
+
+async def extract_rows(
+    page,
+    selector: str,
+    fields: Optional[Dict[str, str]] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> Dict[str, Any]:
+    """
+    Extract every element matching `selector` as JSON rows in one evaluation.
+
+    - A single <table> with no `fields` becomes {"columns": [...], "rows": [[...]]}.
+    - Otherwise each match becomes a row: its text, or a {field: value} object
+      built from `fields` (e.g. {"title": "h3", "link": "a@href"}).
+    """
+    limit = max(0, min(limit, MAX_ROWS))
+    offset = max(0, offset)
+    extracted = await page.evaluate(
+        EXTRACT_ROWS_JS,
+        {"selector": selector, "fields": fields or None, "limit": limit, "offset": offset},
+    )
+    extracted["offset"] = offset
+    return extracted
+
+
+async def mutation_count(page) -> Optional[int]:
+    """DOM mutations seen by the page so far (None if the counter is missing)."""
+    return await page.evaluate(MUTATION_COUNT_JS)
+
+
+async def extract_readable(page, selector: str) -> str:
+    """Boilerplate-free, whitespace-normalized text of an element."""
+    raw = await page.evaluate(READABLE_JS, selector)
+    if raw is None:
+        raise ValueError("No element matches selector")
+    return normalize_whitespace(raw)
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+# browser_extract results keyed by (tab, url, selector, mode, mutation count).
+# Entries for a tab are dropped whenever it navigates or clicks; a change made
+# by page scripts bumps the mutation count, so it never serves stale text.
+extract_cache = TTLCache(
+    ttl=env_float("EXTRACT_CACHE_TTL", 120.0),
+    max_entries=env_int("EXTRACT_CACHE_MAX_ENTRIES", 512),
+    max_bytes=env_int("EXTRACT_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+)
+
+
+def invalidate_tab(tab: str) -> int:
+    """Forget cached extractions for a tab after it changed (or closed)."""
+    return extract_cache.invalidate(lambda key: key[0] == tab)
+
+
+# ============================================================================
+# CHUNK CURSORS
+# ============================================================================
+
+# cursor -> (chunks, next index). Lets clients page through large extractions.
+chunk_cursors = TTLCache(
+    ttl=env_float("EXTRACT_CURSOR_TTL", 600.0),
+    max_entries=64,
+    max_bytes=env_int("EXTRACT_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+)
+
+
+def open_cursor(text: str, max_tokens: int) -> Dict[str, Any]:
+    """Chunk text and return the first chunk (plus a cursor if more remain)."""
+    chunks = chunk_text(text, max_tokens) or [""]
+    cursor = None
+    if len(chunks) > 1:
+        cursor = uuid.uuid4().hex[:12]
+        chunk_cursors.put(cursor, (chunks, 1))
+    return {"chunk": chunks[0], "index": 1, "total": len(chunks), "cursor": cursor}
+
+
+def next_chunk(cursor: str) -> Optional[Dict[str, Any]]:
+    """Advance a cursor. None when it is unknown, expired or exhausted."""
+    entry = chunk_cursors.get(cursor)
+    if entry is MISS:
+        return None
+    chunks, position = entry
+    if position + 1 < len(chunks):
+        chunk_cursors.put(cursor, (chunks, position + 1))
+    else:
+        chunk_cursors.invalidate(lambda key: key == cursor)
+    return {
+        "chunk": chunks[position],
+        "index": position + 1,
+        "total": len(chunks),
+        "cursor": cursor if position + 1 < len(chunks) else None,
+    }
+
+
+# ============================================================================
+# DIFF SNAPSHOTS
+# ============================================================================
+
+# (tab, selector) -> (url, text) of the last diff-mode read. Unlike the
+# extract cache this survives clicks: that is exactly what gets diffed.
+snapshots = TTLCache(
+    ttl=env_float("EXTRACT_SNAPSHOT_TTL", 1800.0),
+    max_entries=256,
+    max_bytes=env_int("EXTRACT_CACHE_MAX_BYTES", 8 * 1024 * 1024),
+)
+
+
+def diff_snapshot(tab: str, selector: str, url: str, text: str) -> Optional[List[str]]:
+    """
+    Store `text` as the new snapshot and return the changed lines since the
+    previous one ("- old" / "+ new"; empty list when nothing changed).
+    Returns None when there is no baseline for this page yet.
+    """
+    previous = snapshots.get((tab, selector))
+    snapshots.put((tab, selector), (url, text))
+    if previous is MISS or previous[0] != url:
+        return None
+    # Opcodes rather than unified_diff output, whose header lines look like content starting with "--"/"++"
+    old, new = previous[1].splitlines(), text.splitlines()
+    changes = []
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new).get_opcodes():
+        if op == "equal":
+            continue
+        changes.extend(f"- {line}" for line in old[i1:i2])
+        changes.extend(f"+ {line}" for line in new[j1:j2])
+    return changes
+
+
+def forget_snapshots(tab: str) -> int:
+    """Drop diff baselines for a closed tab."""
+    return snapshots.invalidate(lambda key: key[0] == tab)
@@ -0,0 +1,134 @@
+"""
+MEGANX Embedding Cache
+======================
+Persistent embedding cache in front of the memory embedder.
+
+Vectors are stored as raw float32 blobs in SQLite, keyed by a hash of the
+model name + text, so recurring recall queries and re-stored facts skip the
+ONNX run entirely. Bounded by `max_bytes` with least-recently-used eviction.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from env_config import env_int, env_bool
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed text -> float32 vector cache, bounded by `max_bytes` (LRU).
+    """
+
+    def __init__(self, path: str = "./nexus_embedding_cache.sqlite3", max_bytes: int = 64 * 1024 * 1024, model: str = "all-MiniLM-L6-v2"):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.model = model
+        self._db: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        """Open the cache on first use."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB, size INTEGER, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON vectors(last_used)")
+            self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM vectors").fetchone()[0]
+        return self._db
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Return the cached vectors among `keys` (and mark them recently used)."""
+        if not keys:
+            return {}
+        import numpy as np  # ships with chromadb; imported late like chromadb itself
+        found: Dict[str, Any] = {}
+        with self._lock:
+            db = self._conn()
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in db.execute(f"SELECT key, vector FROM vectors WHERE key IN ({placeholders})", chunk):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                now = time.time()
+                db.executemany("UPDATE vectors SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, Any]) -> None:
+        """Store key -> vector pairs, evicting least-recently-used vectors to stay in bounds."""
+        if not entries:
+            return
+        import numpy as np
+        now = time.time()
+        rows = []
+        for key, vector in entries.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            db = self._conn()
+            for key, _, size, _ in rows:
+                existing = db.execute("SELECT size FROM vectors WHERE key = ?", (key,)).fetchone()
+                self._bytes += size - (existing[0] if existing else 0)
+            db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            db.commit()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used vectors until under the size cap."""
+        if self._bytes <= self.max_bytes:
+            return
+        db = self._conn()
+        for key, size in db.execute("SELECT key, size FROM vectors ORDER BY last_used").fetchall():
+            db.execute("DELETE FROM vectors WHERE key = ?", (key,))
+            self._bytes -= size
+            self.evictions += 1
+            if self._bytes <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        entries = 0
+        if self._db is not None:
+            with self._lock:
+                entries = self._db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+# On by default; MEMORY_EMBED_CACHE=false disables it
+embedding_cache: Optional[EmbeddingCache] = None
+if env_bool("MEMORY_EMBED_CACHE", True):
+    embedding_cache = EmbeddingCache(
+        path=os.getenv("MEMORY_EMBED_CACHE_PATH", "./nexus_embedding_cache.sqlite3"),
+        max_bytes=env_int("MEMORY_EMBED_CACHE_MAX_MB", 64) * 1024 * 1024,
+    )
@@ -0,0 +1,38 @@
+"""
+MEGANX Environment Config
+=========================
+Typed readers for settings supplied through environment variables (.env.example).
+Malformed values fall back to the default instead of crashing the server.
+"""
+
+import os
+from typing import List
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name: str, default: str) -> List[str]:
+    """Read a comma-separated list setting from the environment."""
+    return [item.strip().lower() for item in os.getenv(name, default).split(",") if item.strip()]
@@ -0,0 +1,348 @@
+"""
+MEGANX Fast Fetch
+=================
+httpx fast path for static pages, with Playwright only as a fallback.
+
+Most crawl traffic is static HTML, docs pages or JSON. Those are fetched with
+a pooled `httpx.AsyncClient` (HTTP/2 + keep-alive) and parsed with the
+standard library's HTML parser. Pages that look like they need JavaScript, or
+selectors the lightweight matcher can't handle, escalate to the browser pool.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Optional, Dict, List, Any, Tuple
+
+from env_config import env_int, env_float
+
+# Content types whose body is decoded and returned (anything else is skipped)
+TEXT_CONTENT_TYPES = ("text/", "json", "xml", "javascript")
+
+# Elements whose text never counts as page content
+SKIP_TEXT_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+# Elements without closing tags
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+}
+
+# Start tag -> open elements it implicitly closes (e.g. <li> ends the previous <li>)
+IMPLIED_END = {
+    "li": {"li"}, "p": {"p"}, "option": {"option"},
+    "dt": {"dt", "dd"}, "dd": {"dt", "dd"},
+    "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"},
+}
+
+# Elements that stop the implied-end search (a <li> inside a nested <ul> is not a sibling)
+SCOPE_TAGS = {"ul", "ol", "dl", "table", "tbody", "thead", "tfoot", "select", "div", "body"}
+
+# Empty mount points left behind by client-side rendered apps
+SPA_ROOT_PATTERN = re.compile(
+    r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>', re.IGNORECASE
+)
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) MEGANX-Nexus/1.0"
+
+
+class UnsupportedSelector(ValueError):
+    """Selector uses syntax the lightweight matcher does not implement."""
+
+
+# ============================================================================
+# HTML TREE
+# ============================================================================
+
+class Node:
+    """Minimal DOM node: tag, attributes, children (Nodes or text strings)."""
+
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Any] = []
+        self.parent = parent
+
+    @property
+    def classes(self) -> List[str]:
+        return self.attrs.get("class", "").split()
+
+    def iter(self):
+        """Depth-first iteration over descendant elements (self excluded)."""
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.iter()
+
+    def text(self) -> str:
+        """Visible text content with whitespace collapsed."""
+        parts: List[str] = []
+        self._collect_text(parts)
+        return " ".join(" ".join(parts).split())
+
+    def _collect_text(self, parts: List[str]) -> None:
+        for child in self.children:
+            if isinstance(child, Node):
+                if child.tag not in SKIP_TEXT_TAGS:
+                    child._collect_text(parts)
+            else:
+                parts.append(child)
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds a Node tree, tolerating the unclosed tags real pages are full of."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {})
+        self._stack = [self.root]
+
+    def handle_starttag(self, tag, attrs):
+        closes = IMPLIED_END.get(tag)
+        if closes:
+            for i in range(len(self._stack) - 1, 0, -1):
+                open_tag = self._stack[i].tag
+                if open_tag in closes:
+                    del self._stack[i:]
+                    break
+                if open_tag in SCOPE_TAGS:
+                    break
+        node = Node(tag, {k: v or "" for k, v in attrs}, parent=self._stack[-1])
+        self._stack[-1].children.append(node)
+        if tag not in VOID_TAGS:
+            self._stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {k: v or "" for k, v in attrs}, parent=self._stack[-1])
+        self._stack[-1].children.append(node)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i].tag == tag:
+                del self._stack[i:]
+                return
+
+    def handle_data(self, data):
+        self._stack[-1].children.append(data)
+
+
+def parse_html(html: str) -> Node:
+    """Parse an HTML document into a Node tree."""
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+# ============================================================================
+# SELECTORS (tag, #id, .class, [attr], [attr=value], descendant and child)
+# ============================================================================
+
+_COMPOUND = re.compile(
+    r"""^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:\#[\w-]+|\.[\w-]+|\[[\w-]+(?:=(?:"[^"]*"|'[^']*'|[^\]]*))?\])*)$"""
+)
+_PARTS = re.compile(r"""\#[\w-]+|\.[\w-]+|\[([\w-]+)(?:=("[^"]*"|'[^']*'|[^\]]*))?\]""")
+
+
+def _parse_compound(token: str) -> Tuple[Optional[str], List[Tuple[str, str, Optional[str]]]]:
+    match = _COMPOUND.match(token)
+    if not match or not token:
+        raise UnsupportedSelector(token)
+    tests = []
+    for part in _PARTS.finditer(match.group("rest") or ""):
+        text = part.group(0)
+        if text.startswith("#"):
+            tests.append(("id", text[1:], None))
+        elif text.startswith("."):
+            tests.append(("class", text[1:], None))
+        else:
+            value = part.group(2)
+            tests.append(("attr", part.group(1), value.strip("\"'") if value is not None else None))
+    tag = match.group("tag")
+    return (None if tag in (None, "*") else tag.lower()), tests
+
+
+def _matches(node: Node, compound) -> bool:
+    tag, tests = compound
+    if tag and node.tag != tag:
+        return False
+    for kind, name, value in tests:
+        if kind == "id" and node.attrs.get("id") != name:
+            return False
+        if kind == "class" and name not in node.classes:
+            return False
+        if kind == "attr" and (name not in node.attrs or (value is not None and node.attrs[name] != value)):
+            return False
+    return True
+
+
+def _parse_selector(selector: str) -> List[Tuple[str, Any]]:
+    """Split a selector into [(combinator, compound), ...] (combinator: ' ' or '>')."""
+    tokens = re.sub(r"\s*>\s*", " > ", selector.strip()).split()
+    steps, combinator = [], " "
+    for token in tokens:
+        if token == ">":
+            combinator = ">"
+            continue
+        steps.append((combinator, _parse_compound(token)))
+        combinator = " "
+    if not steps or combinator == ">":
+        raise UnsupportedSelector(selector)
+    return steps
+
+
+def _matches_path(node: Node, steps) -> bool:
+    """Right-to-left match of a parsed selector against a node."""
+    combinator, compound = steps[-1]
+    if not _matches(node, compound):
+        return False
+    if len(steps) == 1:
+        return True
+    ancestor = node.parent
+    while ancestor is not None and ancestor.tag != "#document":
+        if _matches_path(ancestor, steps[:-1]):
+            return True
+        if combinator == ">":
+            return False
+        ancestor = ancestor.parent
+    return False
+
+
+def select_one(root: Node, selector: str) -> Optional[Node]:
+    """First element matching the selector (comma groups supported)."""
+    groups = [_parse_selector(group) for group in selector.split(",")]
+    for node in root.iter():
+        if any(_matches_path(node, steps) for steps in groups):
+            return node
+    return None
+
+
+# ============================================================================
+# JAVASCRIPT DETECTION
+# ============================================================================
+
+def needs_javascript(html: str, root: Node) -> bool:
+    """Heuristic: does this page only make sense after client-side rendering?"""
+    body = select_one(root, "body") or root
+    text_length = len(body.text())
+    script_count = sum(1 for node in root.iter() if node.tag == "script")
+    if SPA_ROOT_PATTERN.search(html) and text_length < 500:
+        return True
+    for node in root.iter():
+        if node.tag == "noscript" and "javascript" in node.text().lower() and text_length < 1000:
+            return True
+    return script_count > 0 and text_length < 200
+
+
+# ============================================================================
+# FETCHER
+# ============================================================================
+
+class FastFetcher:
+    """Pooled httpx client (HTTP/2 when `h2` is installed) + static extraction."""
+
+    def __init__(self, timeout: Optional[float] = None, max_chars: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.timeout = timeout or env_float("BROWSER_FETCH_TIMEOUT", 10.0)
+        self.max_chars = max_chars or env_int("BROWSER_FETCH_MAX_CHARS", 20000)
+        self.max_bytes = max_bytes or env_int("BROWSER_FETCH_MAX_BYTES", 2_000_000)
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import httpx
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                follow_redirects=True,
+                timeout=self.timeout,
+                headers={"user-agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _read_capped(self, response) -> Tuple[bytes, bool]:
+        """Read at most `max_bytes` of the body; True when the rest was dropped."""
+        chunks, size = [], 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                return b"".join(chunks)[: self.max_bytes], True
+        return b"".join(chunks), False
+
+    async def fetch(self, url: str, selectors: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Fetch without a browser. Sets "escalate" when the result needs Playwright
+        (JS-rendered page, unsupported or unmatched selectors).
+        """
+        async with self._get_client().stream("GET", url) as response:
+            content_type = response.headers.get("content-type", "").lower()
+            result: Dict[str, Any] = {
+                "url": str(response.url),
+                "status": response.status_code,
+                "engine": "httpx",
+                "http_version": response.http_version,
+                "escalate": False,
+            }
+            if "html" not in content_type and not any(t in content_type for t in TEXT_CONTENT_TYPES):
+                # Images, PDFs, archives...: not parsed, the body is never read
+                result["content_type"] = content_type
+                return result
+            body, truncated = await self._read_capped(response)
+            text = body.decode(response.encoding or "utf-8", errors="replace")
+        if truncated:
+            result["truncated"] = True
+
+        if "html" not in content_type:
+            # JSON, plain text, XML... returned as-is
+            result["content_type"] = content_type
+            result["text"] = text[: self.max_chars]
+            return result
+
+        html = text
+        root = parse_html(html)
+        title = select_one(root, "title")
+        result["title"] = title.text() if title else ""
+        if needs_javascript(html, root):
+            result["escalate"] = True
+            return result
+
+        if not selectors:
+            body = select_one(root, "body") or root
+            result["text"] = body.text()[: self.max_chars]
+            return result
+
+        results, errors = {}, {}
+        for selector in dict.fromkeys(selectors):
+            try:
+                node = select_one(root, selector)
+            except UnsupportedSelector:
+                result["escalate"] = True
+                return result
+            if node is None:
+                errors[selector] = "No element matches selector"
+            else:
+                results[selector] = node.text()
+        if errors:
+            # Missing elements on a static fetch often means they are rendered by JS
+            result["escalate"] = True
+        result["results"], result["errors"] = results, errors
+        return result
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+fast_fetcher = FastFetcher()
@@ -0,0 +1,241 @@
+"""
+MEGANX HTTP Cache
+=================
+Persistent on-disk response cache for the Playwright browser.
+
+Plugged into the browser pool's request routing: GET responses are stored on
+disk keyed by URL + request headers, served back while fresh, and revalidated
+with ETag / Last-Modified once stale. An offline "replay only" mode serves
+everything from disk and never touches the network.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from env_config import env_int, env_bool
+
+# Request headers that change the response and therefore the cache key
+KEY_HEADERS = ("accept", "accept-language")
+
+# Response headers that must not be replayed (body is stored decoded)
+DROP_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+# Requests carrying these are per-user: never served from or stored in the shared cache
+CREDENTIAL_HEADERS = ("cookie", "authorization", "proxy-authorization")
+
+
+def _parse_max_age(cache_control: str, date: Optional[str], expires: Optional[str]) -> Optional[float]:
+    """Freshness lifetime in seconds, or None when the response must not be stored."""
+    directives = {d.strip().split("=")[0].lower(): d.strip() for d in cache_control.split(",") if d.strip()}
+    # The cache is shared by every browser session, so "private" is as good as "no-store"
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if name in directives:
+            match = re.search(r"=\s*\"?(\d+)", directives[name])
+            if match:
+                return float(match.group(1))
+    if expires:
+        try:
+            base = parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - base)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+class DiskResponseCache:
+    """
+    SQLite index + one file per response body, bounded by `max_bytes` (LRU).
+    """
+
+    def __init__(self, directory: str = "./nexus_http_cache", max_bytes: int = 256 * 1024 * 1024, offline: bool = False):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        """Open the index on first use."""
+        if self._db is None:
+            (self.directory / "bodies").mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.directory / "index.sqlite3", check_same_thread=False)
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT,
+                    size INTEGER, expires_at REAL, etag TEXT, last_modified TEXT, last_used REAL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+        return self._db
+
+    @staticmethod
+    def cache_key(url: str, headers: Dict[str, str]) -> str:
+        parts = [url] + [f"{h}:{headers.get(h, '')}" for h in KEY_HEADERS]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    # ========================================================================
+    # STORAGE
+    # ========================================================================
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Fetch an index entry (and its body) or None."""
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT status, headers, expires_at, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body_path = self.directory / "bodies" / key
+            if not body_path.exists():
+                self._conn().execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn().execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn().commit()
+        status, headers, expires_at, etag, last_modified = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body_path.read_bytes(),
+            "expires_at": expires_at,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def store(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """Store a response if its Cache-Control allows it."""
+        max_age = _parse_max_age(headers.get("cache-control", ""), headers.get("date"), headers.get("expires"))
+        if max_age is None or status != 200 or len(body) > self.max_bytes or "set-cookie" in headers:
+            return False
+        kept = {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+        now = time.time()
+        with self._lock:
+            (self.directory / "bodies").mkdir(parents=True, exist_ok=True)
+            (self.directory / "bodies" / key).write_bytes(body)
+            self._conn().execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(kept), len(body), now + max_age,
+                 headers.get("etag"), headers.get("last-modified"), now),
+            )
+            self._evict()
+            self._conn().commit()
+        return True
+
+    def refresh(self, key: str, headers: Dict[str, str]) -> None:
+        """Extend freshness after a 304 Not Modified."""
+        max_age = _parse_max_age(headers.get("cache-control", ""), headers.get("date"), headers.get("expires")) or 0.0
+        with self._lock:
+            self._conn().execute(
+                "UPDATE responses SET expires_at = ?, last_used = ? WHERE key = ?",
+                (time.time() + max_age, time.time(), key),
+            )
+            self._conn().commit()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used responses until under the size cap."""
+        db = self._conn()
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            (self.directory / "bodies" / key).unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    # ========================================================================
+    # ROUTING
+    # ========================================================================
+
+    async def handle(self, route) -> None:
+        """Serve a GET request from cache, revalidate it, or fetch and store it."""
+        request = route.request
+        # all_headers() includes the cookies the browser attaches
+        sent = await request.all_headers()
+        if any(sent.get(h) for h in CREDENTIAL_HEADERS):
+            if self.offline:
+                await route.abort("internetdisconnected")
+            else:
+                await route.continue_()
+            return
+
+        # SQLite and body files are blocking I/O: keep them off the event loop
+        key = self.cache_key(request.url, request.headers)
+        entry = await asyncio.to_thread(self.lookup, key)
+
+        if entry and (self.offline or entry["expires_at"] > time.time()):
+            self.hits += 1
+            await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+            return
+        if self.offline:
+            self.misses += 1
+            await route.abort("internetdisconnected")
+            return
+
+        headers = dict(request.headers)
+        if entry and entry["etag"]:
+            headers["if-none-match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["if-modified-since"] = entry["last_modified"]
+        try:
+            response = await route.fetch(headers=headers)
+            body = await response.body() if not (entry and response.status == 304) else None
+        except Exception:
+            # Unresolved routes hang the page: fail the request instead
+            await route.abort("failed")
+            return
+
+        if entry and response.status == 304:
+            self.revalidated += 1
+            await asyncio.to_thread(self.refresh, key, response.headers)
+            await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+            return
+
+        self.misses += 1
+        await route.fulfill(response=response, body=body)
+        await asyncio.to_thread(self.store, key, request.url, response.status, response.headers, body)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        entries, size = 0, 0
+        if self._db is not None:
+            with self._lock:
+                entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "offline": self.offline,
+        }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+# Opt-in: BROWSER_HTTP_CACHE=true (BROWSER_HTTP_CACHE_OFFLINE=true replays only)
+http_cache: Optional[DiskResponseCache] = None
+if env_bool("BROWSER_HTTP_CACHE", False) or env_bool("BROWSER_HTTP_CACHE_OFFLINE", False):
+    http_cache = DiskResponseCache(
+        directory=os.getenv("BROWSER_HTTP_CACHE_DIR", "./nexus_http_cache"),
+        max_bytes=env_int("BROWSER_HTTP_CACHE_MAX_MB", 256) * 1024 * 1024,
+        offline=env_bool("BROWSER_HTTP_CACHE_OFFLINE", False),
+    )
@@ -0,0 +1,149 @@
+"""
+MEGANX Keyword Index
+====================
+Incrementally maintained BM25 inverted index over stored memories.
+
+Vector search misses exact identifiers, names and error strings; this index
+catches them. Postings live in SQLite next to the Chroma store and are
+updated on every write, so keyword recall never touches the embedder.
+"""
+
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Dict, List, Set, Tuple
+
+# Words plus dotted/dashed compounds (foo.bar, ERR_CONNECTION-REFUSED, v1.2.3)
+TOKEN_RE = re.compile(r"\w+(?:[.\-:/]\w+)*")
+
+# BM25 parameters (the usual Okapi defaults)
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased tokens; compounds are indexed whole and by their parts."""
+    tokens = []
+    for match in TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        parts = [p for p in re.split(r"[._\-:/]", match) if p]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class KeywordIndex:
+    """SQLite-backed BM25 index: document lengths + (term, doc) postings."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Open the index on first use."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, length INTEGER)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT, doc_id TEXT, tf INTEGER, PRIMARY KEY (term, doc_id))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)")
+        return self._db
+
+    # ========================================================================
+    # WRITE
+    # ========================================================================
+
+    def add(self, ids: List[str], documents: List[str]) -> None:
+        """Index (or re-index) documents."""
+        with self._lock:
+            db = self._conn()
+            self._delete(db, ids)
+            for doc_id, document in zip(ids, documents):
+                counts = Counter(tokenize(document))
+                db.execute("INSERT INTO docs VALUES (?, ?)", (doc_id, sum(counts.values())))
+                db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                               [(term, doc_id, tf) for term, tf in counts.items()])
+            db.commit()
+
+    def remove(self, ids: List[str]) -> None:
+        with self._lock:
+            db = self._conn()
+            self._delete(db, ids)
+            db.commit()
+
+    @staticmethod
+    def _delete(db: sqlite3.Connection, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            db.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", chunk)
+            db.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", chunk)
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM postings")
+            db.execute("DELETE FROM docs")
+            db.commit()
+
+    def rebuild(self, ids: List[str], documents: List[str]) -> None:
+        """Replace the whole index (used when it is missing or out of sync)."""
+        self.clear()
+        self.add(ids, documents)
+
+    def vacuum(self) -> None:
+        """Reclaim the space left by deletes."""
+        with self._lock:
+            self._conn().execute("VACUUM")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    # ========================================================================
+    # SEARCH
+    # ========================================================================
+
+    def search(self, query: str, n_results: int = 10, allowed: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Top documents by BM25 score, as (id, score), best first. `allowed` restricts the candidates."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            db = self._conn()
+            total_docs, total_length = db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            if not total_docs:
+                return []
+            avg_length = total_length / total_docs
+            scores: Dict[str, float] = {}
+            for term in terms:
+                postings = db.execute(
+                    "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log((total_docs - df + 0.5) / (df + 0.5) + 1)
+                for doc_id, tf, length in postings:
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    norm = tf + K1 * (1 - B + B * length / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:n_results]
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """Fuse several best-first ID rankings: score = sum of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
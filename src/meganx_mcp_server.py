@@ -1,128 +1,667 @@
-from mcp.server.fastmcp import FastMCP
-from playwright.sync_api import sync_playwright
+# Startup clock first, so the report covers every import below
+import startup_profile
+
+import asyncio
+import json
+import sys
+import time
+from contextlib import asynccontextmanager
+
+from mcp.server.fastmcp import FastMCP, Context
 
 # Security Module
-from security import dom_rate_limiter, memory_rate_limiter, kill_switch
+from security import dom_rate_limiter, memory_rate_limiter, kill_switch, confine_path
 
 # Memory Tier System
 from memory_tiers import memory_tiers
 
+# Vector Memory (ChromaDB)
+from vector_memory import VectorMemory, vector_memory, make_filters
+from memory_namespaces import memory_namespaces, NoSuchNamespace
+from write_behind import write_behind, QueueFull
+from memory_retention import RetentionPolicy, retention_policy, compact, COMPACT_INTERVAL
+from memory_snapshot import export_snapshot, import_snapshot, EXPORT_CHUNK_SIZE, SNAPSHOT_ROOT
+from memory_ingest import ingest, INGEST_CHUNK_TOKENS, INGEST_OVERLAP_TOKENS, INGEST_ROOT
+
+# Async Browser Engine
+from browser_pool import browser_pool, PoolExhausted, WAIT_UNTIL_CHOICES
+from dom_extraction import (
+    extract_many, extract_rows, extract_readable, extract_cache, invalidate_tab, mutation_count, open_cursor, next_chunk,
+    diff_snapshot, forget_snapshots,
+)
+from env_config import env_int, env_bool
+from ttl_cache import MISS
+from crawler import fetch_page, crawl, crawl_config, summarize, RENDER_CHOICES
+from fast_fetch import fast_fetcher
+
+# Background warm-up: MEGANX_WARMUP=true or `--warmup` on the command line
+WARMUP = env_bool("MEGANX_WARMUP", False) or "--warmup" in sys.argv
+
+async def _warm_up() -> None:
+    """Launch the browser pool and load the embedding model in parallel."""
+    started = time.perf_counter()
+
+    async def timed(label, coro):
+        t0 = time.perf_counter()
+        try:
+            await coro
+            print(f"[WARMUP] {label} ready in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+        except Exception as e:
+            print(f"[WARMUP] {label} failed: {e}", file=sys.stderr)
+
+    await asyncio.gather(
+        timed("Browser pool", browser_pool.start()),
+        timed("Embedding model", asyncio.to_thread(vector_memory.warm_up)),
+    )
+    print(f"[WARMUP] Done in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+async def _compaction_loop() -> None:
+    """Apply the retention policy to every namespace every MEMORY_COMPACT_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(COMPACT_INTERVAL)
+        memory_namespaces.reap()
+        try:
+            namespaces = await asyncio.to_thread(memory_namespaces.names)
+        except Exception as e:
+            print(f"[COMPACT] Failed to list namespaces: {e}", file=sys.stderr)
+            continue
+        for namespace in namespaces:
+            try:
+                report = await asyncio.to_thread(memory_namespaces.read, namespace, compact, retention_policy, False)
+                if report["selected"]:
+                    print(f"[COMPACT] {namespace}: pruned {report['deleted']} memories "
+                          f"({report['total_before']} -> {report['total_after']}) in {report['elapsed_ms']}ms", file=sys.stderr)
+            except Exception as e:
+                print(f"[COMPACT] {namespace}: failed: {e}", file=sys.stderr)
+
+@asynccontextmanager
+async def _lifespan(server):
+    """Optional warm-up, write journal replay and compaction job on startup; flush + browser/HTTP shutdown on exit."""
+    warmup = asyncio.create_task(_warm_up()) if WARMUP else None
+    if write_behind:
+        write_behind.start()
+    compaction = None
+    if COMPACT_INTERVAL > 0 and retention_policy.enabled:
+        compaction = asyncio.create_task(_compaction_loop())
+    try:
+        yield {}
+    finally:
+        if warmup:
+            warmup.cancel()
+        if compaction:
+            compaction.cancel()
+        if write_behind:
+            # Anything not committed in time stays in the journal for the next start
+            await asyncio.to_thread(write_behind.flush, 10.0)
+        await browser_pool.close()
+        await fast_fetcher.close()
+
 # Initialize the MCP Server
-mcp = FastMCP("MEGANX Core")
+mcp = FastMCP("MEGANX Core", lifespan=_lifespan)
 
-# Global Playwright State (Simplified for PoC)
-# In production, this should be managed more robustly
-playwright = None
-browser = None
-page = None
+# Tools called without a session_id share this pinned context, so
+# navigate -> click -> extract keeps operating on the same page.
+DEFAULT_TAB = "default"
 
-def _ensure_browser():
-    """Ensures the browser is open and ready."""
-    global playwright, browser, page
-    if not playwright:
-        playwright = sync_playwright().start()
-        browser = playwright.chromium.launch(headless=False) # Headless=False to see the magic
-        page = browser.new_page()
+def _tab(session_id: str | None) -> str:
+    """Pool pin for a tool call: its own session, or the shared default tab."""
+    return session_id or DEFAULT_TAB
 
-@mcp.tool()
-def browser_navigate(url: str) -> str:
-    """Navigates the browser to a specific URL."""
-    # Security checks
+# Default chunk size for readable extractions (fits Sparrow's 2048-token context)
+EXTRACT_CHUNK_TOKENS = env_int("EXTRACT_CHUNK_TOKENS", 512)
+
+def _format_chunk(label: str, chunk: dict) -> str:
+    """Render one chunk of a paged extraction."""
+    if chunk["total"] == 1:
+        return f"{label}: {chunk['chunk']}"
+    more = f", next cursor: {chunk['cursor']}" if chunk["cursor"] else ", last chunk"
+    return f"{label} [chunk {chunk['index']}/{chunk['total']}{more}]:\n{chunk['chunk']}"
+
+def _dom_guard() -> str | None:
+    """Kill switch + DOM rate limit check. Returns an error message or None."""
     blocked = kill_switch.check_or_block()
     if blocked:
         return blocked
     if not dom_rate_limiter.can_execute():
         return f"[RATE LIMIT] {dom_rate_limiter.remaining_actions()} DOM actions remaining. Wait."
     dom_rate_limiter.record_action()
-    
-    _ensure_browser()
-    page.goto(url)
-    return f"Navigated to {url}. Title: {page.title()}"
+    return None
 
 @mcp.tool()
-def browser_click(selector: str) -> str:
+async def browser_navigate(url: str, session_id: str | None = None, wait_until: str | None = None) -> str:
+    """
+    Navigates the browser to a specific URL. Pass session_id to use an isolated tab.
+    wait_until: commit | domcontentloaded | load | networkidle (default from BROWSER_WAIT_UNTIL).
+    """
+    wait_until = wait_until or browser_pool.config.wait_until
+    if wait_until not in WAIT_UNTIL_CHOICES:
+        return f"Failed to navigate to {url}: wait_until must be one of {', '.join(WAIT_UNTIL_CHOICES)}"
+
+    # Security checks
+    blocked = _dom_guard()
+    if blocked:
+        return blocked
+
+    tab = _tab(session_id)
+    try:
+        async with browser_pool.lease(tab) as page:
+            await page.goto(url, wait_until=wait_until)
+            return f"Navigated to {url}. Title: {await page.title()}"
+    except Exception as e:
+        return f"Failed to navigate to {url}: {str(e)}"
+    finally:
+        invalidate_tab(tab)
+
+@mcp.tool()
+async def browser_click(selector: str, session_id: str | None = None) -> str:
     """Clicks an element on the page using a CSS selector."""
     # Security checks
-    blocked = kill_switch.check_or_block()
+    blocked = _dom_guard()
     if blocked:
         return blocked
-    if not dom_rate_limiter.can_execute():
-        return f"[RATE LIMIT] {dom_rate_limiter.remaining_actions()} DOM actions remaining. Wait."
-    dom_rate_limiter.record_action()
-    
-    _ensure_browser()
+
+    tab = _tab(session_id)
     try:
-        page.click(selector, timeout=5000)
-        return f"Clicked element: {selector}"
+        async with browser_pool.lease(tab) as page:
+            await page.click(selector, timeout=5000)
+            return f"Clicked element: {selector}"
     except Exception as e:
         return f"Failed to click {selector}: {str(e)}"
+    finally:
+        invalidate_tab(tab)
+
+@mcp.tool()
+async def browser_extract(
+    selector: str,
+    session_id: str | None = None,
+    mode: str = "text",
+    max_tokens: int | None = None,
+) -> str:
+    """
+    Extracts text content from a specific element (cached until the page's DOM changes).
+    mode="readable" strips nav/footer/scripts/hidden nodes, normalizes whitespace and
+    returns the first ~max_tokens chunk plus a cursor for browser_next_chunk.
+    mode="diff" returns only the lines that changed since the last diff read of this
+    selector on the same page (the first read returns the full readable text).
+    """
+    if mode not in ("text", "readable", "diff"):
+        return f"Failed to extract from {selector}: mode must be text, readable or diff"
+    tab = _tab(session_id)
+    read_mode = "readable" if mode == "diff" else mode
+    try:
+        async with browser_pool.lease(tab) as page:
+            url = page.url
+            # Reading the counter is one small evaluate; a hit skips the extraction itself
+            mutations = await mutation_count(page)
+            key = (tab, url, selector, read_mode, mutations)
+            content = MISS
+            if mutations is not None and not kill_switch.is_active():
+                content = extract_cache.get(key)
+
+            if content is MISS:
+                # Security checks
+                blocked = _dom_guard()
+                if blocked:
+                    return blocked
+                if read_mode == "readable":
+                    content = await extract_readable(page, selector)
+                else:
+                    content = await page.text_content(selector, timeout=5000)
+                if mutations is not None:
+                    extract_cache.put(key, content)
+    except Exception as e:
+        return f"Failed to extract from {selector}: {str(e)}"
+
+    if mode == "text":
+        return f"Content of {selector}: {content}"
+    if mode == "diff":
+        changes = diff_snapshot(tab, selector, url, content)
+        if changes == []:
+            return f"[NO CHANGE] {selector}"
+        if changes is not None:
+            added = sum(1 for line in changes if line.startswith("+"))
+            diff_text = "\n".join(changes)
+            return _format_chunk(
+                f"[DIFF] {selector} (+{added}/-{len(changes) - added} lines)",
+                open_cursor(diff_text, max_tokens or EXTRACT_CHUNK_TOKENS),
+            )
+    return _format_chunk(f"Content of {selector}", open_cursor(content, max_tokens or EXTRACT_CHUNK_TOKENS))
 
 @mcp.tool()
-def browser_extract(selector: str) -> str:
-    """Extracts text content from a specific element."""
+def browser_next_chunk(cursor: str) -> str:
+    """Returns the next chunk of a readable extraction started by browser_extract."""
+    chunk = next_chunk(cursor)
+    if chunk is None:
+        return f"[CURSOR] Unknown, expired or exhausted: {cursor}"
+    return _format_chunk("Content", chunk)
+
+@mcp.tool()
+async def browser_extract_many(selectors: list[str], session_id: str | None = None) -> str:
+    """
+    Extracts text content for many selectors in one call (one rate-limited action).
+    Returns JSON: {"results": {selector: text}, "errors": {selector: message}}.
+    """
     # Security checks
-    blocked = kill_switch.check_or_block()
+    blocked = _dom_guard()
     if blocked:
         return blocked
-    if not dom_rate_limiter.can_execute():
-        return f"[RATE LIMIT] {dom_rate_limiter.remaining_actions()} DOM actions remaining. Wait."
-    dom_rate_limiter.record_action()
-    
-    _ensure_browser()
+
     try:
-        content = page.text_content(selector, timeout=5000)
-        return f"Content of {selector}: {content}"
+        async with browser_pool.lease(_tab(session_id)) as page:
+            extracted = await extract_many(page, selectors)
+            return json.dumps(extracted, ensure_ascii=False)
     except Exception as e:
-        return f"Failed to extract from {selector}: {str(e)}"
+        return f"Failed to extract {len(selectors)} selectors: {str(e)}"
 
-import chromadb
-from chromadb.utils import embedding_functions
-
-# Global ChromaDB State
-chroma_client = None
-collection = None
-
-def _ensure_memory():
-    """Ensures the ChromaDB client is initialized."""
-    global chroma_client, collection
-    if not chroma_client:
-        chroma_client = chromadb.PersistentClient(path="./nexus_memory")
-        # Use default embedding function (all-MiniLM-L6-v2)
-        ef = embedding_functions.DefaultEmbeddingFunction()
-        collection = chroma_client.get_or_create_collection(name="meganx_memories", embedding_function=ef)
-
-@mcp.tool()
-def memory_store(content: str) -> str:
-    """Stores a memory in the Nexus Vector Database (ChromaDB)."""
-    _ensure_memory()
-    try:
-        # Generate a simple ID based on hash or timestamp
-        import time
-        mem_id = f"mem_{int(time.time())}"
-        collection.add(
-            documents=[content],
-            metadatas=[{"timestamp": time.time(), "source": "mcp_agent"}],
-            ids=[mem_id]
-        )
-        return f"Stored memory [{mem_id}]: {content}"
+@mcp.tool()
+async def browser_extract_rows(
+    selector: str,
+    fields: dict[str, str] | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    session_id: str | None = None,
+) -> str:
+    """
+    Extracts all elements matching a selector (lists, tables) as JSON rows in one call.
+    A <table> selector returns columns + row arrays. For lists, pass fields mapping
+    names to sub-selectors, optionally with @attr (e.g. {"title": "h3", "link": "a@href"}).
+    Use limit/offset to page through large result sets.
+    """
+    # Security checks
+    blocked = _dom_guard()
+    if blocked:
+        return blocked
+
+    try:
+        async with browser_pool.lease(_tab(session_id)) as page:
+            extracted = await extract_rows(page, selector, fields, limit, offset)
+            return json.dumps(extracted, ensure_ascii=False)
+    except Exception as e:
+        return f"Failed to extract rows from {selector}: {str(e)}"
+
+@mcp.tool()
+async def browser_fetch(url: str, selectors: list[str] | None = None, render: str = "auto") -> str:
+    """
+    Fetches a page, trying a plain HTTP request before the browser.
+    render: auto (HTTP first, Playwright if the page needs JavaScript) | static | browser.
+    Without selectors returns the page text; with selectors a {selector: text} map.
+    """
+    # Security checks
+    blocked = _dom_guard()
+    if blocked:
+        return blocked
+
+    try:
+        return json.dumps(await fetch_page(url, selectors, render), ensure_ascii=False)
+    except Exception as e:
+        return f"Failed to fetch {url}: {str(e)}"
+
+@mcp.tool()
+async def browser_crawl(
+    urls: list[str],
+    selectors: list[str] | None = None,
+    max_concurrency: int | None = None,
+    render: str = "auto",
+    timeout: float | None = None,
+    ctx: Context | None = None,
+) -> str:
+    """
+    Fetches many URLs in parallel (per-host limits, per-URL timeout) and returns
+    partial results even if some fail. Each finished URL is also streamed as a log
+    message with progress notifications. Counts as one rate-limited action.
+    """
+    if len(urls) > crawl_config.max_urls:
+        return f"[CRAWL] Too many URLs ({len(urls)}). Max per batch: {crawl_config.max_urls}."
+    if render not in RENDER_CHOICES:
+        return f"[CRAWL] render must be one of {', '.join(RENDER_CHOICES)}"
+
+    # Security checks
+    blocked = _dom_guard()
+    if blocked:
+        return blocked
+
+    done = 0
+
+    async def stream(result: dict) -> None:
+        nonlocal done
+        done += 1
+        if ctx:
+            await ctx.report_progress(done, len(urls))
+            await ctx.info(json.dumps(result, ensure_ascii=False))
+
+    results = await crawl(urls, selectors, max_concurrency, render, timeout, on_result=stream)
+    return summarize(results)
+
+# ============================================================================
+# BROWSER SESSION TOOLS
+# ============================================================================
+
+@mcp.tool()
+async def browser_session_open(session_id: str | None = None) -> str:
+    """Opens an isolated browser tab (own cookies/storage) and returns its session_id."""
+    blocked = kill_switch.check_or_block()
+    if blocked:
+        return blocked
+    try:
+        session_id = await browser_pool.open_session(session_id)
+        return f"[SESSION] Opened: {session_id}"
+    except PoolExhausted as e:
+        return f"[SESSION] Failed to open: {str(e)}"
+
+@mcp.tool()
+async def browser_session_list() -> str:
+    """Lists open browser sessions (idle ones are reaped first)."""
+    sessions = await browser_pool.list_sessions()
+    if not sessions:
+        return "[SESSIONS] None open."
+    return "[SESSIONS]\n" + "\n".join(
+        f"- {s['session_id']}: {s['url']} (uses: {s['uses']}, idle: {s['idle_seconds']}s"
+        f"{', busy' if s['busy'] else ''})"
+        for s in sessions
+    )
+
+@mcp.tool()
+async def browser_session_close(session_id: str) -> str:
+    """Closes a browser session and frees its tab."""
+    if await browser_pool.close_session(session_id):
+        invalidate_tab(session_id)
+        forget_snapshots(session_id)
+        return f"[SESSION] Closed: {session_id}"
+    return f"[SESSION] Not found: {session_id}"
+
+def _http_cache_summary() -> str:
+    if not browser_pool.response_cache:
+        return "OFF"
+    stats = browser_pool.response_cache.stats()
+    mode = "REPLAY ONLY" if stats["offline"] else "ON"
+    return (f"{mode} - {stats['hits']} hits, {stats['revalidated']} revalidated, "
+            f"{stats['misses']} misses, {stats['entries']} entries ({stats['bytes']} bytes)")
+
+@mcp.tool()
+def browser_stats() -> str:
+    """Returns browser pool and extraction cache statistics."""
+    pool = browser_pool.stats()
+    cache = extract_cache.stats()
+    return f"""[BROWSER STATS]
+- Pool: {pool['free']} free, {pool['leased']} leased, {pool['pinned']} sessions (max {pool['max_contexts']})
+- Lean Mode: {'ON' if pool['lean'] else 'OFF'} ({pool['blocked_requests']} requests blocked)
+- Extract Cache: {cache['hits']} hits / {cache['misses']} misses (hit rate {cache['hit_rate']:.0%})
+- Extract Cache Size: {cache['entries']} entries, {cache['bytes']} bytes
+- HTTP Disk Cache: {_http_cache_summary()}"""
+
+# ============================================================================
+# MEMORY TOOLS
+# ============================================================================
+
+@mcp.tool()
+async def memory_store(
+    content: str,
+    tags: list[str] | None = None,
+    session_id: str | None = None,
+    namespace: str | None = None,
+) -> str:
+    """
+    Stores a memory in the Nexus Vector Database (ChromaDB). Identical content is stored once.
+    tags / session_id are saved as metadata that memory_recall and memory_recent can filter on.
+    namespace: tenant whose separate memory this goes to (default: the shared one).
+    """
+    metadata = {key: value for key, value in (("tags", tags), ("session", session_id)) if value} or None
+    try:
+        if write_behind:
+            try:
+                mem_id = await asyncio.to_thread(write_behind.enqueue, content, metadata, 30.0, namespace)
+            except QueueFull as e:
+                return f"[QUEUE FULL] {e}. Retry after memory_flush."
+            return f"Queued memory [{mem_id}]: {content}"
+        with memory_namespaces.use(namespace) as memory:
+            item = (await asyncio.to_thread(memory.store_many, [content], [metadata]))[0]
+        if "error" in item:
+            raise ValueError(item["error"])
+        if item.get("duplicate"):
+            return f"Memory already stored [{item['id']}]: {content}"
+        return f"Stored memory [{item['id']}]: {content}"
     except Exception as e:
         return f"Failed to store memory: {str(e)}"
 
 @mcp.tool()
-def memory_recall(query: str, n_results: int = 3) -> str:
-    """Retrieves relevant memories based on a semantic query."""
-    _ensure_memory()
+async def memory_store_many(
+    contents: list[str],
+    metadatas: list[dict] | None = None,
+    namespace: str | None = None,
+) -> str:
+    """
+    Stores many memories in one call with batched embedding.
+    metadatas (optional) must match contents one-to-one; a "tags" list in a
+    metadata dict becomes filterable tags. namespace as in memory_store.
+    Returns JSON with one {"id"} or {"error"} per item, in order; content
+    that is already stored keeps its ID and is flagged "duplicate".
+    """
+    try:
+        with memory_namespaces.use(namespace) as memory:
+            items = await asyncio.to_thread(memory.store_many, contents, metadatas)
+    except Exception as e:
+        return f"Failed to store memories: {str(e)}"
+    stored = sum(1 for item in items if "id" in item and not item.get("duplicate"))
+    duplicates = sum(1 for item in items if item.get("duplicate"))
+    failed = len(items) - stored - duplicates
+    return json.dumps({"stored": stored, "duplicates": duplicates, "failed": failed, "items": items}, ensure_ascii=False)
+
+@mcp.tool()
+async def memory_recall(
+    query: str,
+    n_results: int = 3,
+    mode: str = "vector",
+    source: str | None = None,
+    tags: list[str] | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    session_id: str | None = None,
+    read_your_writes: bool = False,
+    flush_timeout: float = 10.0,
+    namespace: str | None = None,
+) -> str:
+    """
+    Retrieves relevant memories based on a query.
+    mode: vector (semantic) | keyword (BM25, exact names/IDs/error strings, no embedding)
+          | hybrid (both, fused).
+    Filters: source, tags (all must match), session_id, and a time range where
+    since/until are epoch seconds, ISO 8601 (UTC unless it has an offset) or an age such as "30m", "1h", "2d".
+    read_your_writes: wait (up to flush_timeout seconds) for queued memory_store
+    writes to commit first.
+    namespace: search only this tenant's memory (default: the shared one).
+    """
     try:
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
+        filters = make_filters(source, tags, since, until, session_id)
+        stale = ""
+        if read_your_writes and write_behind:
+            if not await asyncio.to_thread(write_behind.flush, flush_timeout):
+                pending = write_behind.stats()["pending"]
+                stale = f"[FLUSH TIMEOUT] {pending} writes still pending after {flush_timeout}s; results may miss them\n"
+        memories = await asyncio.to_thread(
+            memory_namespaces.read, namespace, VectorMemory.recall, query, n_results, mode, filters)
         # Format results for the LLM
-        memories = results['documents'][0]
-        return f"Recalled memories for '{query}':\n" + "\n".join([f"- {m}" for m in memories])
+        return stale + f"Recalled memories for '{query}':\n" + "\n".join([f"- {m}" for m in memories])
+    except NoSuchNamespace as e:
+        return f"[NO SUCH NAMESPACE] {e}"
     except Exception as e:
         return f"Failed to recall memory: {str(e)}"
 
+@mcp.tool()
+async def memory_recent(
+    n_results: int = 10,
+    source: str | None = None,
+    tags: list[str] | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    session_id: str | None = None,
+    namespace: str | None = None,
+) -> str:
+    """
+    Lists the newest memories matching the filters, without a semantic query
+    (e.g. since="1h" for what was learned in the last hour). Filters and namespace as in memory_recall.
+    """
+    try:
+        filters = make_filters(source, tags, since, until, session_id)
+        entries = await asyncio.to_thread(memory_namespaces.read, namespace, VectorMemory.recent, n_results, filters)
+    except NoSuchNamespace as e:
+        return f"[NO SUCH NAMESPACE] {e}"
+    except Exception as e:
+        return f"Failed to list memories: {str(e)}"
+    if not entries:
+        return "[NO MEMORIES] Nothing matches these filters"
+    lines = []
+    for entry in entries:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["metadata"].get("timestamp", 0)))
+        lines.append(f"- [{stamp}] {entry['document']}")
+    return f"Recent memories ({len(entries)}):\n" + "\n".join(lines)
+
+@mcp.tool()
+async def memory_flush(timeout: float = 60.0) -> str:
+    """Waits until every queued memory_store write is embedded and committed."""
+    if not write_behind:
+        return "[FLUSH] Write-behind is off (MEMORY_WRITE_BEHIND); writes are already committed"
+    done = await asyncio.to_thread(write_behind.flush, timeout)
+    stats = write_behind.stats()
+    if not done:
+        return f"[FLUSH TIMEOUT] {stats['pending']} writes still pending after {timeout}s"
+    failed = ""
+    if stats["failed"]:
+        failed = f", {stats['failed']} failed ({stats['awaiting_retry']} kept for retry on restart; last error: {stats['last_error']})"
+    return f"[FLUSHED] {stats['committed']} committed, {stats['duplicates']} duplicates{failed}"
+
+@mcp.tool()
+async def memory_compact(
+    dry_run: bool = True,
+    max_entries: int | None = None,
+    max_age_days: float | None = None,
+    archive: bool | None = None,
+    namespace: str | None = None,
+) -> str:
+    """
+    Prunes memories that break the retention policy (MEMORY_RETENTION_* settings;
+    arguments override them for this run) in one namespace (default: the shared one).
+    dry_run (default) only reports what would be reclaimed. Pruned memories are
+    archived to the COLD tier unless archive=False.
+    """
+    policy = RetentionPolicy(
+        max_entries=retention_policy.max_entries if max_entries is None else max_entries,
+        max_age_days=retention_policy.max_age_days if max_age_days is None else max_age_days,
+        source_quotas=retention_policy.source_quotas,
+        archive=retention_policy.archive if archive is None else archive,
+    )
+    if not policy.enabled:
+        return "[COMPACT] No retention limits set (MEMORY_RETENTION_* or max_entries/max_age_days)"
+    try:
+        report = await asyncio.to_thread(memory_namespaces.read, namespace, compact, policy, dry_run)
+        return json.dumps(report, ensure_ascii=False)
+    except NoSuchNamespace as e:
+        return f"[NO SUCH NAMESPACE] {e}"
+    except Exception as e:
+        return f"Failed to compact memory: {str(e)}"
+
+def _progress_reporter(ctx: Context | None):
+    """Thread-safe progress callback for work running in asyncio.to_thread."""
+    if not ctx:
+        return None
+    loop = asyncio.get_running_loop()
+
+    def report(done: int, total: int) -> None:
+        asyncio.run_coroutine_threadsafe(ctx.report_progress(done, total), loop)
+    return report
+
+@mcp.tool()
+async def memory_export(
+    path: str,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    namespace: str | None = None,
+    ctx: Context | None = None,
+) -> str:
+    """
+    Exports every memory of a namespace (default: the shared one) with its
+    precomputed embedding to a snapshot directory under MEMORY_SNAPSHOT_ROOT
+    (.npy vector chunks + JSONL records + manifest.json). Load it on another
+    node with memory_import; nothing is re-embedded. Returns the manifest (JSON).
+    """
+    try:
+        path = str(confine_path(path, SNAPSHOT_ROOT))
+    except ValueError as e:
+        return f"Failed to export memory: {str(e)}"
+    if write_behind:
+        await asyncio.to_thread(write_behind.flush, 60.0)
+    try:
+        manifest = await asyncio.to_thread(
+            memory_namespaces.read, namespace, export_snapshot, path, chunk_size, _progress_reporter(ctx))
+    except NoSuchNamespace as e:
+        return f"[NO SUCH NAMESPACE] {e}"
+    except Exception as e:
+        return f"Failed to export memory: {str(e)}"
+    manifest.pop("chunks")
+    return json.dumps(manifest, ensure_ascii=False)
+
+@mcp.tool()
+async def memory_import(path: str, namespace: str | None = None, ctx: Context | None = None) -> str:
+    """
+    Bulk-loads a memory_export snapshot (a directory under MEMORY_SNAPSHOT_ROOT)
+    into a namespace (default: the shared one) without re-embedding. IDs are
+    kept; memories already stored (same ID or content) are skipped, so an
+    interrupted import can simply be re-run. Returns counts (JSON).
+    """
+    try:
+        path = str(confine_path(path, SNAPSHOT_ROOT))
+        with memory_namespaces.use(namespace) as memory:
+            result = await asyncio.to_thread(import_snapshot, memory, path, _progress_reporter(ctx))
+    except Exception as e:
+        return f"Failed to import memory: {str(e)}"
+    return json.dumps(result, ensure_ascii=False)
+
+@mcp.tool()
+async def memory_ingest(
+    path: str | None = None,
+    text: str | None = None,
+    source: str = "ingest",
+    tags: list[str] | None = None,
+    max_tokens: int = INGEST_CHUNK_TOKENS,
+    overlap_tokens: int = INGEST_OVERLAP_TOKENS,
+    resume: bool = True,
+    namespace: str | None = None,
+    ctx: Context | None = None,
+) -> str:
+    """
+    Loads a text file (path, relative to or inside MEMORY_INGEST_ROOT) or a
+    large text into memory: splits it into overlapping token-bounded chunks,
+    skips chunks already stored, embeds the rest in parallel and bulk-writes
+    them. Memory use stays bounded for any input size. An interrupted ingest
+    of the same input resumes from its last checkpoint. Returns a report (JSON).
+    """
+    try:
+        if path is not None:
+            # Never read arbitrary server files (.env, keys) into recallable memory
+            path = str(confine_path(path, INGEST_ROOT))
+        with memory_namespaces.use(namespace) as memory:
+            report = await asyncio.to_thread(
+                ingest, memory, text=text, path=path, source=source, tags=tags, max_tokens=max_tokens,
+                overlap_tokens=overlap_tokens, resume=resume, progress=_progress_reporter(ctx),
+            )
+    except Exception as e:
+        return f"Failed to ingest: {str(e)}"
+    return json.dumps(report, ensure_ascii=False)
+
+@mcp.tool()
+async def memory_stats(namespace: str | None = None) -> str:
+    """
+    Memory collection size and embedding/recall cache hit rates for a namespace
+    (default: the shared one), plus open namespaces and write queue state (JSON).
+    """
+    try:
+        stats = await asyncio.to_thread(memory_namespaces.read, namespace, VectorMemory.stats)
+        stats["namespaces"] = memory_namespaces.stats()
+        stats["write_behind"] = write_behind.stats() if write_behind else None
+        return json.dumps(stats)
+    except NoSuchNamespace as e:
+        return f"[NO SUCH NAMESPACE] {e}"
+    except Exception as e:
+        return f"Failed to read memory stats: {str(e)}"
+
 # ============================================================================
 # SECURITY TOOLS
 # ============================================================================
@@ -170,6 +709,29 @@ def tier_stats() -> str:
 - COLD (Archived): {stats['cold_entries']} entries
 - TOTAL: {stats['total']} entries"""
 
+# ============================================================================
+# DIAGNOSTICS
+# ============================================================================
+
+@mcp.tool()
+async def server_startup_report(include_imports: bool = False) -> str:
+    """
+    Reports server startup cost: module import time and lazily loaded subsystems.
+    include_imports=True adds a `python -X importtime` breakdown (takes ~1s).
+    """
+    lines = ["[STARTUP REPORT]"]
+    lines += [f"- {label}: {seconds * 1000:.0f} ms" for label, seconds in startup_profile.timings().items()]
+    if include_imports:
+        rows = await asyncio.to_thread(startup_profile.import_time_breakdown)
+        lines += ["", startup_profile.format_breakdown(rows)]
+    return "\n".join(lines)
+
+startup_profile.record("server module import", time.perf_counter() - startup_profile.PROCESS_START)
+
 if __name__ == "__main__":
+    if "--importtime" in sys.argv:
+        # Print the import-time breakdown instead of serving
+        print(startup_profile.format_breakdown(startup_profile.import_time_breakdown()))
+        sys.exit(0)
     # Runs the server via stdio (standard input/output) for local agent connection
     mcp.run()
@@ -0,0 +1,291 @@
+"""
+MEGANX Memory Ingestion
+=======================
+Streaming ingestion of large texts and files (PDF-to-text dumps, crawled
+sites) into the vector memory.
+
+The input flows through a chain of generators: read (byte blocks cut at
+paragraph breaks) -> chunk (token-bounded, with overlap) -> dedup (content
+hash, against the collection and the batches still in flight) -> embed
+(batches fanned out to a process pool sized to the input, one ONNX session
+per worker) -> bulk write. Only one block and a bounded number of in-flight
+batches are held at a time, whatever the size of the input.
+
+Once every chunk of a block is written, the block's end offset is
+checkpointed. An interrupted ingest resumes from there; chunks re-read past
+the checkpoint are caught by the dedup stage and never re-embedded.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Dict, List, Any, BinaryIO, Callable, Iterator, Tuple
+
+from env_config import env_int
+from text_chunking import chunk_text, normalize_whitespace, CHARS_PER_TOKEN
+from vector_memory import VectorMemory, expand_tags
+
+# Only files under this directory can be ingested through the MCP tool
+INGEST_ROOT = os.getenv("MEMORY_INGEST_ROOT") or os.path.join(os.getenv("CHROMA_DB_PATH", "./nexus_memory"), "inbox")
+
+# Bytes read per block (the unit of checkpointing)
+INGEST_BLOCK_BYTES = env_int("MEMORY_INGEST_BLOCK_KB", 256) * 1024
+
+# all-MiniLM-L6-v2 truncates at 256 word pieces; ~200 estimated tokens stays under it
+INGEST_CHUNK_TOKENS = env_int("MEMORY_INGEST_CHUNK_TOKENS", 200)
+INGEST_OVERLAP_TOKENS = env_int("MEMORY_INGEST_OVERLAP_TOKENS", 32)
+
+# Embedding processes (0 = one per CPU core, up to DEFAULT_MAX_WORKERS; 1 = embed in-process)
+INGEST_WORKERS = env_int("MEMORY_INGEST_WORKERS", 0)
+
+# Each worker loads its own ONNX session (a few hundred MB): keep the default
+# well inside small-RAM machines
+DEFAULT_MAX_WORKERS = 4
+
+# Spawning a worker and loading its model costs seconds; only worth it with
+# at least this many embedding batches for it
+MIN_BATCHES_PER_WORKER = 8
+
+# Batches queued per worker, so a worker never waits on the reader
+IN_FLIGHT_PER_WORKER = 2
+
+Progress = Callable[[int, int], None]
+
+
+# ============================================================================
+# READ / CHUNK
+# ============================================================================
+
+def read_blocks(stream: BinaryIO, block_bytes: int = INGEST_BLOCK_BYTES) -> Iterator[Tuple[int, str]]:
+    """(end offset, text) blocks from a binary stream, each cut after a paragraph or line break."""
+    offset = stream.tell()
+    carry = b""
+    while True:
+        data = stream.read(block_bytes)
+        buffer = carry + data
+        if not data:
+            if buffer:
+                yield offset + len(buffer), buffer.decode("utf-8", errors="replace")
+            return
+        cut = buffer.rfind(b"\n\n") + 2
+        if cut < 2:
+            cut = buffer.rfind(b"\n") + 1
+        if cut < 1:
+            # No line break in the whole block: cut before the last (maybe partial) UTF-8 character
+            cut = len(buffer) - 1
+            while cut > 0 and buffer[cut] & 0xC0 == 0x80:
+                cut -= 1
+        if cut == 0:
+            carry = buffer
+            continue
+        offset += cut
+        carry = buffer[cut:]
+        yield offset, buffer[:cut].decode("utf-8", errors="replace")
+
+
+def chunk_batches(blocks: Iterator[Tuple[int, str]], batch_size: int, max_tokens: int,
+                  overlap_tokens: int) -> Iterator[Tuple[List[str], Optional[int]]]:
+    """
+    Batches of chunks, each with the end offset of the last block completed
+    by the time its last chunk was cut (None if no block finished). Once a
+    batch is written, input before that offset is fully stored.
+    """
+    texts: List[str] = []
+    done: Optional[int] = None
+    for end, block in blocks:
+        for chunk in chunk_text(normalize_whitespace(block), max_tokens, overlap_tokens):
+            texts.append(chunk)
+            if len(texts) >= batch_size:
+                yield texts, done
+                texts, done = [], None
+        done = end
+    if texts or done is not None:
+        yield texts, done
+
+
+# ============================================================================
+# EMBED (process pool)
+# ============================================================================
+
+_worker_ef = None
+
+
+def _init_worker(threads: int) -> None:
+    """Load the embedding model once per worker process, capped at `threads` ONNX threads."""
+    global _worker_ef
+    import onnxruntime
+    from chromadb.utils import embedding_functions
+
+    class SessionOptions(onnxruntime.SessionOptions):
+        def __init__(self):
+            super().__init__()
+            self.intra_op_num_threads = threads
+
+    # Chroma builds the session options itself; without the cap every worker
+    # would start one ONNX thread per core and oversubscribe the machine
+    onnxruntime.SessionOptions = SessionOptions
+    _worker_ef = embedding_functions.DefaultEmbeddingFunction()
+
+
+def _embed_batch(texts: List[str]) -> Any:
+    import numpy as np
+    return np.asarray(_worker_ef(texts), dtype=np.float32)
+
+
+def plan_workers(requested: int, remaining_bytes: int, max_tokens: int, batch_size: int) -> int:
+    """Embedding processes for an input: `requested` (0 = default), fewer for small inputs."""
+    workers = requested or min(os.cpu_count() or 1, DEFAULT_MAX_WORKERS)
+    batches = remaining_bytes / (max(1, max_tokens) * CHARS_PER_TOKEN * max(1, batch_size))
+    return max(1, min(workers, int(batches // MIN_BATCHES_PER_WORKER)))
+
+
+class Embedder:
+    """Embeds batches through the embedding cache, then a process pool (or in-process with one worker)."""
+
+    def __init__(self, memory: VectorMemory, workers: int):
+        self.memory = memory
+        self.workers = workers
+        self.pool: Optional[ProcessPoolExecutor] = None
+        if workers > 1:
+            # Fetch the model once here rather than in every worker at the same time
+            memory.warm_up()
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            # spawn: forking a process that runs Chroma's and asyncio's threads is unsafe
+            self.pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=_init_worker, initargs=(threads,))
+
+    def submit(self, texts: List[str]) -> Callable[[], List[Any]]:
+        """Start embedding `texts`; returns a callable that waits for the vectors."""
+        if self.pool is None:
+            vectors = self.memory.embed(texts)
+            return lambda: vectors
+        cache = self.memory.cache
+        keys = [cache.key(text) for text in texts] if cache else list(range(len(texts)))
+        vectors = cache.get_many(list(dict.fromkeys(keys))) if cache else {}
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        future = self.pool.submit(_embed_batch, list(missing.values())) if missing else None
+
+        def result() -> List[Any]:
+            if future is not None:
+                fresh = dict(zip(missing, future.result()))
+                if cache:
+                    cache.put_many(fresh)
+                vectors.update(fresh)
+            return [vectors[key] for key in keys]
+        return result
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+def ingest(memory: VectorMemory, text: Optional[str] = None, path: Optional[str] = None,
+           source: str = "ingest", tags: Optional[List[str]] = None,
+           max_tokens: int = INGEST_CHUNK_TOKENS, overlap_tokens: int = INGEST_OVERLAP_TOKENS,
+           workers: Optional[int] = None, resume: bool = True, block_bytes: int = INGEST_BLOCK_BYTES,
+           progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """
+    Chunk, dedup, embed and store a file (`path`) or a large `text`.
+    Each chunk is stored with metadata source, document (file name) and
+    `tags`. With `resume`, an earlier interrupted run over the same input
+    and settings continues from its last checkpoint. Returns a report.
+    """
+    if (text is None) == (path is None):
+        raise ValueError("Pass either text or path")
+    started = time.perf_counter()
+    memory.ensure()
+    if path is not None:
+        file = Path(path).expanduser().resolve()
+        stat = file.stat()
+        total, document = stat.st_size, file.name
+        identity = f"{file}:{stat.st_size}:{stat.st_mtime_ns}"
+        stream: BinaryIO = open(file, "rb")
+    else:
+        data = text.encode("utf-8")
+        total, document = len(data), "text"
+        identity = hashlib.sha256(data).hexdigest()
+        stream = io.BytesIO(data)
+
+    # Same input + same chunking = same checkpoint
+    key = json.dumps([memory.collection.name, identity, max_tokens, overlap_tokens, block_bytes])
+    checkpoint = Path(memory.path) / "ingest" / f"{hashlib.sha256(key.encode()).hexdigest()[:16]}.json"
+    state = {"offset": 0, "chunks": 0, "stored": 0, "duplicates": 0}
+    if resume and checkpoint.exists():
+        state.update(json.loads(checkpoint.read_text(encoding="utf-8")))
+    resumed_from = state["offset"]
+
+    def save() -> None:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        tmp = checkpoint.with_suffix(".tmp")
+        tmp.write_text(json.dumps(dict(state, source=identity)), encoding="utf-8")
+        os.replace(tmp, checkpoint)
+
+    workers = plan_workers(INGEST_WORKERS if workers is None else workers, total - resumed_from,
+                           max_tokens, memory.batch_size)
+    embedder = Embedder(memory, workers)
+    base_metadata = expand_tags({"source": source, "document": document, "tags": tags or []})
+    in_flight: deque = deque()  # (texts, metadatas, done offset, vectors)
+    pending_hashes: set = set()
+
+    def commit() -> None:
+        texts, metadatas, done, vectors = in_flight.popleft()
+        if texts:
+            result = memory.import_entries([memory.next_id(t) for t in texts], texts, metadatas, vectors())
+            state["stored"] += result["imported"]
+            state["duplicates"] += result["skipped"]
+            pending_hashes.difference_update(m["content_hash"] for m in metadatas)
+        if done is not None:
+            state["offset"] = done
+            save()
+            if progress:
+                progress(done, total)
+
+    try:
+        stream.seek(resumed_from)
+        for texts, done in chunk_batches(read_blocks(stream, block_bytes), memory.batch_size,
+                                         max_tokens, overlap_tokens):
+            state["chunks"] += len(texts)
+            # Dedup before embedding: repeats in this batch, in flight, or already stored
+            fresh: Dict[str, str] = {}
+            for chunk in texts:
+                fresh.setdefault(memory.content_hash(chunk), chunk)
+            stored = memory.stored_hashes([h for h in fresh if h not in pending_hashes])
+            keep = {h: chunk for h, chunk in fresh.items() if h not in pending_hashes and h not in stored}
+            state["duplicates"] += len(texts) - len(keep)
+            pending_hashes.update(keep)
+            now = time.time()
+            metadatas = [dict(base_metadata, timestamp=now, content_hash=h) for h in keep]
+            chunks = list(keep.values())
+            in_flight.append((chunks, metadatas, done, embedder.submit(chunks) if chunks else None))
+            while len(in_flight) > workers * IN_FLIGHT_PER_WORKER:
+                commit()
+        while in_flight:
+            commit()
+    finally:
+        embedder.close()
+        stream.close()
+    checkpoint.unlink(missing_ok=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "document": document,
+        "collection": memory.collection.name,
+        "bytes": total,
+        "resumed_from": resumed_from,
+        "chunks": state["chunks"],
+        "stored": state["stored"],
+        "duplicates": state["duplicates"],
+        "workers": workers,
+        "elapsed_ms": round(elapsed * 1000),
+        "chunks_per_second": round(state["chunks"] / elapsed, 1) if elapsed else None,
+    }
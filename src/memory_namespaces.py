@@ -0,0 +1,173 @@
+"""
+MEGANX Memory Namespaces
+========================
+Per-tenant memories: each namespace is its own Chroma collection (with its
+own keyword, metadata and quantized indexes), so recall only ever searches
+the caller's data instead of filtering a shared index.
+
+Handles are opened lazily on first use and kept in an LRU. Idle namespaces
+(and the least recently used ones beyond MEMORY_NAMESPACE_MAX_OPEN) are
+dropped, which releases their SQLite connections, memmaps and recall cache.
+A handle in use by a running call is never dropped, so two handles never
+write the same collection at once. Chroma keeps its own LRU of loaded HNSW
+indexes underneath.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any, Callable, Iterator
+
+from env_config import env_int, env_float
+from vector_memory import VectorMemory, CollectionNotFound, vector_memory
+
+# No "_": it separates the vector store suffix in collection names (see VectorMemory.ensure)
+NAMESPACE_RE = re.compile(r"^[a-z0-9][a-z0-9-]{0,47}$")
+
+# Namespace of the shared collection (also what namespace=None means)
+DEFAULT_NAMESPACE = "default"
+
+# Collection of namespace "alice": meganx_memories__alice
+SEPARATOR = "__"
+
+
+class NoSuchNamespace(LookupError):
+    """Raised when a read-only call names a namespace that was never written to."""
+
+
+def normalize_namespace(namespace: Optional[str]) -> Optional[str]:
+    """Lower-cased namespace, or None for the default one. Raises ValueError if malformed."""
+    if namespace is None or not str(namespace).strip():
+        return None
+    name = str(namespace).strip().lower()
+    if name == DEFAULT_NAMESPACE:
+        return None
+    if not NAMESPACE_RE.match(name):
+        raise ValueError(f"Bad namespace {namespace!r}: use 1-48 lower-case letters, digits or '-'")
+    return name
+
+
+class MemoryNamespaces:
+    """LRU of per-namespace VectorMemory handles; the default namespace is always open."""
+
+    def __init__(self, default: VectorMemory, max_open: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.default = default
+        self.max_open = env_int("MEMORY_NAMESPACE_MAX_OPEN", 16) if max_open is None else max_open
+        self.idle_ttl = env_float("MEMORY_NAMESPACE_IDLE_TTL", 900.0) if idle_ttl is None else idle_ttl
+        self._open: "OrderedDict[str, VectorMemory]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._busy: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.evicted = 0
+
+    def _handle(self, namespace: str) -> VectorMemory:
+        """Handle for a namespace (caller holds the lock)."""
+        memory = self._open.get(namespace)
+        if memory is None:
+            memory = VectorMemory(
+                path=self.default.path,
+                collection_name=f"{self.default.collection_name}{SEPARATOR}{namespace}",
+                batch_size=self.default.batch_size,
+                cache=self.default.cache,  # same model, so embeddings are shared across tenants
+                vector_store=self.default.vector_store,
+            )
+            self._open[namespace] = memory
+            self.opened += 1
+        self._open.move_to_end(namespace)
+        self._last_used[namespace] = time.monotonic()
+        return memory
+
+    def _evict(self) -> None:
+        """Drop idle handles, then the least recently used ones over max_open (caller holds the lock)."""
+        now = time.monotonic()
+        for namespace in list(self._open):
+            if self._busy.get(namespace):
+                continue
+            idle = self.idle_ttl and now - self._last_used[namespace] > self.idle_ttl
+            if idle or len(self._open) > self.max_open:
+                del self._open[namespace]
+                del self._last_used[namespace]
+                self.evicted += 1
+
+    @contextmanager
+    def use(self, namespace: Optional[str] = None, create: bool = True) -> Iterator[VectorMemory]:
+        """
+        The namespace's VectorMemory, pinned (never evicted) until the block
+        exits. With create=False (read-only callers) a namespace that has no
+        collection yet raises NoSuchNamespace instead of being created.
+        """
+        name = normalize_namespace(namespace)
+        if name is None:
+            yield self.default
+            return
+        with self._lock:
+            memory = self._handle(name)
+            self._busy[name] = self._busy.get(name, 0) + 1
+            self._evict()
+        try:
+            if not create:
+                try:
+                    memory.ensure(create=False)
+                except CollectionNotFound:
+                    raise NoSuchNamespace(f"No such namespace: {name!r}") from None
+            yield memory
+        finally:
+            with self._lock:
+                self._busy[name] -= 1
+                if not self._busy[name]:
+                    del self._busy[name]
+                self._last_used[name] = time.monotonic()
+                if name not in self._busy and not memory.ready:
+                    # Never opened (missing namespace): don't keep a handle for it
+                    del self._open[name]
+                    del self._last_used[name]
+                self._evict()
+
+    def read(self, namespace: Optional[str], fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        fn(memory, *args) on an existing namespace (NoSuchNamespace if it has
+        none). Blocking: opening a namespace may rebuild its indexes, so async
+        callers run this in asyncio.to_thread.
+        """
+        with self.use(namespace, create=False) as memory:
+            return fn(memory, *args)
+
+    def reap(self) -> int:
+        """Drop idle handles now. Returns the number dropped."""
+        with self._lock:
+            before = self.evicted
+            self._evict()
+            return self.evicted - before
+
+    def names(self) -> List[str]:
+        """Every namespace with a collection on disk, default first."""
+        self.default.ensure()
+        prefix = f"{self.default.collection_name}{SEPARATOR}"
+        found = set()
+        for collection in self.default.client.list_collections():
+            name = getattr(collection, "name", collection)
+            if name.startswith(prefix):
+                # Strip a quantized store suffix ("alice_int8" -> "alice")
+                found.add(name[len(prefix):].split("_")[0])
+        return [DEFAULT_NAMESPACE] + sorted(found)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open": list(self._open),
+                "busy": sorted(self._busy),
+                "max_open": self.max_open,
+                "idle_ttl": self.idle_ttl,
+                "opened": self.opened,
+                "evicted": self.evicted,
+            }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+memory_namespaces = MemoryNamespaces(vector_memory)
@@ -0,0 +1,146 @@
+"""
+MEGANX Memory Retention
+=======================
+Retention policies and compaction for the vector memory.
+
+Without pruning the collection grows forever and recall latency and disk use
+creep up with it (the Sparrow design doc: "keep Vector DB small"). A policy
+caps total entries, entry age and per-source counts. Compaction selects the
+memories that break it, optionally archives them to the COLD tier, deletes
+them in bulk and vacuums the indexes. A dry run only reports what would be
+reclaimed.
+"""
+
+import os
+import time
+from typing import Optional, Dict, List, Any
+
+from env_config import env_int, env_float, env_bool
+from memory_tiers import MemoryTier, memory_tiers
+from vector_memory import VectorMemory
+
+# Preview entries included in a dry-run report
+PREVIEW_ITEMS = 5
+PREVIEW_CHARS = 80
+
+
+def parse_quotas(spec: str) -> Dict[str, int]:
+    """"mcp_agent=5000,crawler=1000" -> {"mcp_agent": 5000, "crawler": 1000}"""
+    quotas = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        source, _, limit = item.partition("=")
+        try:
+            quotas[source.strip()] = int(limit)
+        except ValueError:
+            raise ValueError(f"Bad source quota {item.strip()!r}: expected source=count")
+    return quotas
+
+
+class RetentionPolicy:
+    """Retention limits (0 = unlimited). Defaults come from the environment (see .env.example)."""
+
+    def __init__(self, max_entries: Optional[int] = None, max_age_days: Optional[float] = None,
+                 source_quotas: Optional[Dict[str, int]] = None, archive: Optional[bool] = None):
+        self.max_entries = env_int("MEMORY_RETENTION_MAX_ENTRIES", 0) if max_entries is None else max_entries
+        self.max_age_days = env_float("MEMORY_RETENTION_MAX_AGE_DAYS", 0.0) if max_age_days is None else max_age_days
+        if source_quotas is None:
+            source_quotas = parse_quotas(os.getenv("MEMORY_RETENTION_SOURCE_QUOTAS", ""))
+        self.source_quotas = source_quotas
+        self.archive = env_bool("MEMORY_RETENTION_ARCHIVE", True) if archive is None else archive
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_entries or self.max_age_days or self.source_quotas)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "max_entries": self.max_entries,
+            "max_age_days": self.max_age_days,
+            "source_quotas": self.source_quotas,
+            "archive": self.archive,
+        }
+
+
+def select_expired(memory: VectorMemory, policy: RetentionPolicy) -> Dict[str, List[str]]:
+    """
+    IDs to prune, by reason. Rules apply in order (age, then per-source
+    quotas, then the global cap), each to what the previous ones left.
+    Within a quota or cap the newest entries are kept.
+    """
+    memory.ensure()
+    index = memory.metadata_index
+    doomed: set = set()
+    by_reason: Dict[str, List[str]] = {"max_age": [], "source_quota": [], "max_entries": []}
+
+    if policy.max_age_days:
+        cutoff = time.time() - policy.max_age_days * 86400
+        by_reason["max_age"] = index.query({"until": cutoff})
+        doomed.update(by_reason["max_age"])
+
+    for source, quota in policy.source_quotas.items():
+        survivors = [mem_id for mem_id in index.query({"source": source}) if mem_id not in doomed]
+        over = survivors[max(0, quota):]
+        by_reason["source_quota"].extend(over)
+        doomed.update(over)
+
+    if policy.max_entries:
+        survivors = [mem_id for mem_id in index.query() if mem_id not in doomed]
+        by_reason["max_entries"] = survivors[policy.max_entries:]
+
+    return by_reason
+
+
+def compact(memory: VectorMemory, policy: Optional[RetentionPolicy] = None, dry_run: bool = True,
+            tiers: MemoryTier = memory_tiers) -> Dict[str, Any]:
+    """Apply a retention policy. Returns a report of what was (or would be) reclaimed."""
+    started = time.perf_counter()
+    policy = policy or RetentionPolicy()
+    memory.ensure()
+    total = memory.collection.count()
+    by_reason = select_expired(memory, policy)
+    ids = [mem_id for reason_ids in by_reason.values() for mem_id in reason_ids]
+
+    entries = memory.get(ids)
+    # Rough size: document text plus the float32 vector
+    dim = (memory.vectors.dim if memory.vectors is not None else None) or 384
+    estimated_bytes = sum(len(entry["document"].encode("utf-8")) + dim * 4 for entry in entries)
+
+    report: Dict[str, Any] = {
+        "dry_run": dry_run,
+        "policy": policy.describe(),
+        "total_before": total,
+        "selected": len(ids),
+        "by_reason": {reason: len(reason_ids) for reason, reason_ids in by_reason.items()},
+        "estimated_bytes": estimated_bytes,
+    }
+    if dry_run:
+        report["preview"] = [
+            {"id": entry["id"], "source": entry["metadata"].get("source"),
+             "timestamp": entry["metadata"].get("timestamp"), "document": entry["document"][:PREVIEW_CHARS]}
+            for entry in entries[:PREVIEW_ITEMS]
+        ]
+    else:
+        # Archive first: a crash in between leaves a duplicate in the archive, never a lost memory
+        if policy.archive:
+            report["archived"] = tiers.archive_many([
+                {"key": entry["id"], "content": entry["document"], "metadata": entry["metadata"],
+                 "origin": memory.collection.name}
+                for entry in entries
+            ])
+        report["deleted"] = memory.delete(ids)
+        report["vacuum"] = memory.vacuum() if ids else None
+        report["total_after"] = memory.collection.count()
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+    return report
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+retention_policy = RetentionPolicy()
+
+# Seconds between background compactions (0 = only on demand via memory_compact)
+COMPACT_INTERVAL = env_float("MEMORY_COMPACT_INTERVAL", 0.0)
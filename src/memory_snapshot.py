@@ -0,0 +1,129 @@
+"""
+MEGANX Memory Snapshot
+======================
+Bulk export/import of the vector memory without re-embedding.
+
+A snapshot is a directory of chunks: `vectors-NNNNN.npy` (float32, one row
+per memory) next to `records-NNNNN.jsonl` (id, document, metadata, same
+order), plus a `manifest.json` written last. Export and import work one
+chunk at a time, so memory stays bounded by the chunk size whatever the
+size of the collection. Cloning a populated memory to a new node is a file
+copy and a bulk load instead of hours of embedding on CPU.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Callable
+
+from env_config import env_int
+from vector_memory import VectorMemory
+
+SNAPSHOT_FORMAT = "meganx-memory-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Vectors are only interchangeable between stores using the same embedder
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# memory_export/memory_import only use snapshot directories under this one
+SNAPSHOT_ROOT = os.getenv("MEMORY_SNAPSHOT_ROOT") or os.path.join(os.getenv("CHROMA_DB_PATH", "./nexus_memory"), "snapshots")
+
+# Memories per chunk file
+EXPORT_CHUNK_SIZE = env_int("MEMORY_SNAPSHOT_CHUNK_SIZE", 5000)
+
+Progress = Callable[[int, int], None]
+
+
+def export_snapshot(memory: VectorMemory, directory: str, chunk_size: int = EXPORT_CHUNK_SIZE,
+                    progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """Write every memory (oldest first) to a snapshot directory. Returns the manifest."""
+    import numpy as np
+    started = time.perf_counter()
+    target = Path(directory)
+    target.mkdir(parents=True, exist_ok=True)
+    if (target / "manifest.json").exists():
+        raise FileExistsError(f"{target} already holds a snapshot")
+
+    # The ID list is fixed up front; memories written during the export are left out
+    ids = memory.all_ids()[::-1]
+    chunks, exported, dim = [], 0, None
+    for number, start in enumerate(range(0, len(ids), max(1, chunk_size))):
+        found_ids, documents, metadatas, vectors = memory.export_chunk(ids[start:start + chunk_size])
+        if not found_ids:
+            continue
+        dim = dim or vectors.shape[1]
+        vectors_file, records_file = f"vectors-{number:05d}.npy", f"records-{number:05d}.jsonl"
+        np.save(target / vectors_file, np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(target / records_file, "w", encoding="utf-8") as f:
+            for mem_id, document, metadata in zip(found_ids, documents, metadatas):
+                f.write(json.dumps({"id": mem_id, "document": document, "metadata": metadata},
+                                   ensure_ascii=False) + "\n")
+        chunks.append({"vectors": vectors_file, "records": records_file, "count": len(found_ids)})
+        exported += len(found_ids)
+        if progress:
+            progress(min(start + chunk_size, len(ids)), len(ids))
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "collection": memory.collection.name,
+        "model": EMBEDDING_MODEL,
+        "dim": dim,
+        "count": exported,
+        "chunks": chunks,
+        "created_at": time.time(),
+    }
+    # Manifest last: a directory without one is an incomplete export
+    tmp = target / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, target / "manifest.json")
+    return dict(manifest, path=str(target), elapsed_ms=round((time.perf_counter() - started) * 1000))
+
+
+def import_snapshot(memory: VectorMemory, directory: str,
+                    progress: Optional[Progress] = None) -> Dict[str, Any]:
+    """
+    Bulk-load a snapshot, keeping IDs and vectors. Memories already present
+    (same ID or content) are skipped, so an interrupted import can be re-run.
+    """
+    import numpy as np
+    started = time.perf_counter()
+    source = Path(directory)
+    manifest_path = source / "manifest.json"
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No manifest.json in {source} (missing or incomplete snapshot)")
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"{source} is not a version {SNAPSHOT_VERSION} memory snapshot")
+    if manifest.get("model") != EMBEDDING_MODEL:
+        raise ValueError(f"Snapshot vectors come from {manifest.get('model')}, this memory uses {EMBEDDING_MODEL}")
+
+    imported = skipped = done = 0
+    for chunk in manifest["chunks"]:
+        # mmap: the vectors are only paged in batch by batch as they are written
+        vectors = np.load(source / chunk["vectors"], mmap_mode="r")
+        with open(source / chunk["records"], encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        if len(records) != len(vectors):
+            raise ValueError(f"{chunk['records']} has {len(records)} records for {len(vectors)} vectors")
+        result = memory.import_entries(
+            [r["id"] for r in records],
+            [r["document"] for r in records],
+            [r["metadata"] for r in records],
+            vectors,
+        )
+        imported += result["imported"]
+        skipped += result["skipped"]
+        done += len(records)
+        if progress:
+            progress(done, manifest["count"])
+
+    return {
+        "path": str(source),
+        "collection": memory.collection.name,
+        "snapshot_count": manifest["count"],
+        "imported": imported,
+        "skipped": skipped,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000),
+    }
@@ -27,8 +27,8 @@ class MemoryTier:
     WARM_DIR = Path("./memory/warm")
     COLD_DIR = Path("./memory/cold")
     
-    def __init__(self):
-        # Create directories
+    def _ensure_dirs(self) -> None:
+        """Create tier directories on first write (importing has no side effects)."""
         self.HOT_DIR.mkdir(parents=True, exist_ok=True)
         self.WARM_DIR.mkdir(parents=True, exist_ok=True)
         self.COLD_DIR.mkdir(parents=True, exist_ok=True)
@@ -46,6 +46,7 @@ class MemoryTier:
             "timestamp": datetime.now().isoformat(),
             "tier": "HOT"
         }
+        self._ensure_dirs()
         path = self.HOT_DIR / f"{key}.json"
         path.write_text(json.dumps(entry, indent=2, ensure_ascii=False))
         return f"[HOT] Stored: {key}"
@@ -87,6 +88,7 @@ class MemoryTier:
         }
         
         warm_path = self.WARM_DIR / f"{key}.json"
+        self._ensure_dirs()
         warm_path.write_text(json.dumps(warm_entry, indent=2, ensure_ascii=False))
         
         # Remove from hot
@@ -123,6 +125,7 @@ class MemoryTier:
         entry["tier"] = "COLD"
         
         # Append to JSONL archive
+        self._ensure_dirs()
         archive_path = self.COLD_DIR / "archive.jsonl"
         with open(archive_path, "a", encoding="utf-8") as f:
             f.write(json.dumps(entry, ensure_ascii=False) + "\n")
@@ -132,6 +135,18 @@ class MemoryTier:
         
         return f"[COLD] Archived: {key}"
     
+    def archive_many(self, entries: List[Dict[str, Any]]) -> int:
+        """Append entries straight to the COLD archive (e.g. memories pruned by retention)."""
+        if not entries:
+            return 0
+        self._ensure_dirs()
+        archived_at = datetime.now().isoformat()
+        archive_path = self.COLD_DIR / "archive.jsonl"
+        with open(archive_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps({**entry, "archived_at": archived_at, "tier": "COLD"}, ensure_ascii=False) + "\n")
+        return len(entries)
+    
     def search_cold(self, query: str, limit: int = 10) -> List[Dict]:
         """Search cold archive (simple text match for now)."""
         results = []
@@ -143,7 +158,8 @@ class MemoryTier:
         with open(archive_path, "r", encoding="utf-8") as f:
             for line in f:
                 entry = json.loads(line)
-                if query.lower() in entry.get("summary", "").lower():
+                text = entry.get("summary") or entry.get("content", "")
+                if query.lower() in text.lower():
                     results.append(entry)
                     if len(results) >= limit:
                         break
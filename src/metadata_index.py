@@ -0,0 +1,141 @@
+"""
+MEGANX Metadata Index
+=====================
+Secondary index over memory metadata (timestamp, source, session, tags).
+
+Answers "most recent memories matching these filters" straight from SQLite,
+ordered by timestamp, without a vector query. Also gives keyword recall the
+set of IDs a filter allows. Kept in sync on every write, like the keyword
+index.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+# Tags are stored in Chroma metadata as boolean `tag_<name>` keys
+TAG_PREFIX = "tag_"
+
+
+class MetadataIndex:
+    """SQLite table of (id, timestamp, source, session) plus (tag, id) pairs."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Open the index on first use."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (id TEXT PRIMARY KEY, timestamp REAL, source TEXT, session TEXT)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS tags (tag TEXT, id TEXT, PRIMARY KEY (tag, id))")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_time ON entries(timestamp)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_source ON entries(source, timestamp)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_tags_id ON tags(id)")
+            # One-time upkeep done on the store (see VectorMemory.ensure); survives rebuilds
+            self._db.execute("CREATE TABLE IF NOT EXISTS markers (name TEXT PRIMARY KEY)")
+        return self._db
+
+    # ========================================================================
+    # WRITE
+    # ========================================================================
+
+    def add(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Index (or re-index) entries from their full metadata."""
+        with self._lock:
+            db = self._conn()
+            self._delete(db, ids)
+            db.executemany(
+                "INSERT INTO entries VALUES (?, ?, ?, ?)",
+                [(mem_id, meta.get("timestamp"), meta.get("source"), meta.get("session"))
+                 for mem_id, meta in zip(ids, metadatas)],
+            )
+            db.executemany(
+                "INSERT INTO tags VALUES (?, ?)",
+                [(key[len(TAG_PREFIX):], mem_id)
+                 for mem_id, meta in zip(ids, metadatas)
+                 for key, value in meta.items() if key.startswith(TAG_PREFIX) and value is True],
+            )
+            db.commit()
+
+    def remove(self, ids: List[str]) -> None:
+        with self._lock:
+            db = self._conn()
+            self._delete(db, ids)
+            db.commit()
+
+    @staticmethod
+    def _delete(db: sqlite3.Connection, ids: List[str]) -> None:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            db.execute(f"DELETE FROM entries WHERE id IN ({placeholders})", chunk)
+            db.execute(f"DELETE FROM tags WHERE id IN ({placeholders})", chunk)
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("DELETE FROM entries")
+            db.execute("DELETE FROM tags")
+            db.commit()
+
+    def rebuild(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Replace the whole index (used when it is missing or out of sync)."""
+        self.clear()
+        self.add(ids, metadatas)
+
+    def marker(self, name: str) -> bool:
+        with self._lock:
+            return self._conn().execute("SELECT 1 FROM markers WHERE name = ?", (name,)).fetchone() is not None
+
+    def set_marker(self, name: str) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT OR IGNORE INTO markers VALUES (?)", (name,))
+            db.commit()
+
+    def vacuum(self) -> None:
+        """Reclaim the space left by deletes."""
+        with self._lock:
+            self._conn().execute("VACUUM")
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # ========================================================================
+    # QUERY
+    # ========================================================================
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None) -> List[str]:
+        """IDs matching `filters` (see vector_memory.make_filters), newest first."""
+        filters = filters or {}
+        clauses, params = [], []
+        for column in ("source", "session"):
+            if filters.get(column) is not None:
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get("since") is not None:
+            clauses.append("timestamp >= ?")
+            params.append(filters["since"])
+        if filters.get("until") is not None:
+            clauses.append("timestamp <= ?")
+            params.append(filters["until"])
+        for tag in filters.get("tags") or ():
+            clauses.append("id IN (SELECT id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        sql = "SELECT id FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._conn().execute(sql, params)]
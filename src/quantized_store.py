@@ -0,0 +1,309 @@
+"""
+MEGANX Quantized Vector Store
+=============================
+Compact on-disk vector index for memory recall on small-RAM machines.
+
+Vectors are kept quantized (int8 with a per-vector scale, or float16) in a
+memory-mapped NumPy array that is scanned for a coarse top-k. The candidates
+are then re-ranked exactly against float32 copies that stay on disk, where
+only the handful of candidate rows is ever paged in. Resident memory for a
+scan is 1/4 (int8) or 1/2 (float16) of the float32 vectors, with no HNSW
+graph at all.
+
+Rows are append-only; removed IDs become dead rows until compact() rewrites
+the arrays.
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Set, Tuple
+
+QUANTIZED_DTYPES = ("int8", "float16")
+
+# Coarse candidates re-ranked exactly, per requested result (at least RERANK_MIN)
+RERANK_FACTOR = 10
+RERANK_MIN = 50
+
+# Rows scanned per block, so the float32 working copy stays small
+SCAN_BLOCK = 8192
+
+INITIAL_CAPACITY = 1024
+
+
+class QuantizedVectorStore:
+    """Quantized memmap for coarse search + float32 memmap for exact re-ranking."""
+
+    def __init__(self, directory: str, dtype: str = "int8"):
+        if dtype not in QUANTIZED_DTYPES:
+            raise ValueError(f"dtype must be one of {', '.join(QUANTIZED_DTYPES)}")
+        self.directory = Path(directory)
+        self.dtype = dtype
+        self.dim: Optional[int] = None
+        self.size = 0  # rows used (live + dead)
+        self._codes = None  # (capacity, dim) int8 | float16
+        self._scales = None  # (capacity,) float32, int8 only
+        self._exact = None  # (capacity, dim) float32
+        self._live = None  # (capacity,) bool
+        self._row_of: Dict[str, int] = {}
+        self._id_of: Dict[int, str] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    # ========================================================================
+    # STORAGE
+    # ========================================================================
+
+    def _conn(self) -> sqlite3.Connection:
+        """Open the row table and map the arrays on first use."""
+        if self._db is None:
+            import numpy as np
+            self.directory.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(self.directory / "rows.sqlite3", check_same_thread=False)
+            db.execute("CREATE TABLE IF NOT EXISTS rows (id TEXT PRIMARY KEY, row INTEGER)")
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = dict(db.execute("SELECT key, value FROM meta").fetchall())
+            if meta.get("dtype", self.dtype) != self.dtype:
+                raise ValueError(f"{self.directory} holds {meta['dtype']} vectors, not {self.dtype}")
+            if "dim" in meta:
+                self.dim = int(meta["dim"])
+                self.size = int(meta["size"])
+                self._map(int(meta["capacity"]))
+                self._live = np.zeros(len(self._exact), dtype=bool)
+                for mem_id, row in db.execute("SELECT id, row FROM rows"):
+                    self._row_of[mem_id] = row
+                    self._id_of[row] = mem_id
+                    self._live[row] = True
+            self._db = db
+        return self._db
+
+    def _map(self, capacity: int, mode: str = "r+") -> None:
+        import numpy as np
+        from numpy.lib.format import open_memmap
+        self._codes = open_memmap(self.directory / "codes.npy", mode=mode, dtype=self.dtype, shape=(capacity, self.dim))
+        self._exact = open_memmap(self.directory / "exact.npy", mode=mode, dtype=np.float32, shape=(capacity, self.dim))
+        if self.dtype == "int8":
+            self._scales = open_memmap(self.directory / "scales.npy", mode=mode, dtype=np.float32, shape=(capacity,))
+
+    def _arrays(self) -> Dict[str, Any]:
+        arrays = {"codes": self._codes, "exact": self._exact}
+        if self.dtype == "int8":
+            arrays["scales"] = self._scales
+        return arrays
+
+    def _rewrite(self, rows: List[int], capacity: int) -> None:
+        """Copy `rows` (in order) into fresh arrays of `capacity`, block by block, and swap them in."""
+        from numpy.lib.format import open_memmap
+        for name, old in self._arrays().items():
+            new = open_memmap(self.directory / f"{name}.tmp.npy", mode="w+", dtype=old.dtype,
+                              shape=(capacity,) + old.shape[1:])
+            for start in range(0, len(rows), SCAN_BLOCK):
+                block = rows[start:start + SCAN_BLOCK]
+                new[start:start + len(block)] = old[block]
+            new.flush()
+            del new
+        names = list(self._arrays())
+        self._codes = self._exact = self._scales = None
+        for name in names:
+            os.replace(self.directory / f"{name}.tmp.npy", self.directory / f"{name}.npy")
+        self._map(capacity)
+
+    def _grow(self, needed: int) -> None:
+        """Make room for `needed` rows, doubling capacity (arrays are copied once per doubling)."""
+        import numpy as np
+        capacity = len(self._exact) if self._exact is not None else 0
+        if needed <= capacity:
+            return
+        new_capacity = max(INITIAL_CAPACITY, capacity * 2, needed)
+        if capacity == 0:
+            self._map(new_capacity, mode="w+")
+        else:
+            self._rewrite(list(range(self.size)), new_capacity)
+        live = np.zeros(new_capacity, dtype=bool)
+        if self._live is not None:
+            live[:len(self._live)] = self._live
+        self._live = live
+
+    def _quantize(self, vectors) -> Tuple[Any, Any]:
+        import numpy as np
+        if self.dtype == "float16":
+            return vectors.astype(np.float16), None
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def _normalize(vectors):
+        import numpy as np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    # ========================================================================
+    # WRITE
+    # ========================================================================
+
+    def add(self, ids: List[str], vectors: List[Any]) -> None:
+        """Append (or replace) vectors. Cosine similarity is used, so they are normalized."""
+        if not ids:
+            return
+        vectors = self._normalize(vectors)
+        with self._lock:
+            db = self._conn()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dim vectors, got {vectors.shape[1]}")
+            self._grow(self.size + len(ids))
+            start = self.size
+            rows = range(start, start + len(ids))
+            codes, scales = self._quantize(vectors)
+            self._codes[start:start + len(ids)] = codes
+            self._exact[start:start + len(ids)] = vectors
+            if scales is not None:
+                self._scales[start:start + len(ids)] = scales
+            for array in self._arrays().values():
+                array.flush()
+            # Replaced IDs leave their old row dead
+            for mem_id in ids:
+                if mem_id in self._row_of:
+                    old = self._row_of[mem_id]
+                    self._live[old] = False
+                    self._id_of.pop(old, None)
+            for mem_id, row in zip(ids, rows):
+                self._row_of[mem_id] = row
+                self._id_of[row] = mem_id
+                self._live[row] = True
+            self.size = start + len(ids)
+            db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?)", list(zip(ids, rows)))
+            self._save_meta(db)
+            db.commit()
+
+    def get(self, ids: List[str]) -> Any:
+        """Exact (normalized) float32 vectors for `ids`, in order, as one array."""
+        import numpy as np
+        with self._lock:
+            self._conn()
+            rows = [self._row_of[mem_id] for mem_id in ids]
+            if not rows:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            return np.array(self._exact[rows])
+
+    def remove(self, ids: List[str]) -> int:
+        """Drop IDs (their rows stay allocated until compact()). Returns the count removed."""
+        with self._lock:
+            db = self._conn()
+            removed = [mem_id for mem_id in ids if mem_id in self._row_of]
+            for mem_id in removed:
+                row = self._row_of.pop(mem_id)
+                self._id_of.pop(row, None)
+                self._live[row] = False
+            db.executemany("DELETE FROM rows WHERE id = ?", [(mem_id,) for mem_id in removed])
+            db.commit()
+            return len(removed)
+
+    def compact(self) -> int:
+        """Rewrite the arrays without dead rows. Returns the number of rows reclaimed."""
+        with self._lock:
+            db = self._conn()
+            dead = self.size - len(self._row_of)
+            if not dead:
+                return 0
+            import numpy as np
+            order = sorted(self._row_of.items(), key=lambda item: item[1])
+            capacity = max(INITIAL_CAPACITY, len(order))
+            self._rewrite([row for _, row in order], capacity)
+            self._live = np.zeros(capacity, dtype=bool)
+            self._live[:len(order)] = True
+            self._row_of = {mem_id: row for row, (mem_id, _) in enumerate(order)}
+            self._id_of = {row: mem_id for mem_id, row in self._row_of.items()}
+            self.size = len(order)
+            db.execute("DELETE FROM rows")
+            db.executemany("INSERT INTO rows VALUES (?, ?)", list(self._row_of.items()))
+            self._save_meta(db)
+            db.commit()
+            return dead
+
+    def _save_meta(self, db: sqlite3.Connection) -> None:
+        meta = {"dtype": self.dtype, "dim": self.dim, "size": self.size, "capacity": len(self._exact)}
+        db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+
+    def migrated(self) -> bool:
+        """Whether the float32 collection was already copied in (see VectorMemory.ensure)."""
+        with self._lock:
+            db = self._conn()
+            return db.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone() is not None
+
+    def mark_migrated(self) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', '1')")
+            db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            self._conn()
+            return len(self._row_of)
+
+    # ========================================================================
+    # SEARCH
+    # ========================================================================
+
+    def search(self, query: Any, n_results: int = 10, allowed: Optional[Set[str]] = None,
+               rerank: bool = True) -> List[Tuple[str, float]]:
+        """Top IDs by cosine similarity, as (id, score), best first. `allowed` restricts the candidates."""
+        import numpy as np
+        q = self._normalize([query])[0]
+        with self._lock:
+            self._conn()
+            if not self._row_of or n_results <= 0:
+                return []
+            mask = self._live[:self.size].copy()
+            if allowed is not None:
+                mask[:] = False
+                rows = [self._row_of[mem_id] for mem_id in allowed if mem_id in self._row_of]
+                mask[rows] = True
+            # Coarse pass over the quantized codes, block by block
+            coarse = np.full(self.size, -np.inf, dtype=np.float32)
+            for start in range(0, self.size, SCAN_BLOCK):
+                end = min(start + SCAN_BLOCK, self.size)
+                scores = self._codes[start:end].astype(np.float32) @ q
+                if self.dtype == "int8":
+                    scores *= self._scales[start:end]
+                coarse[start:end] = np.where(mask[start:end], scores, -np.inf)
+            live = int(mask.sum())
+            k = min(n_results, live)
+            if k == 0:
+                return []
+            candidates = min(live, max(n_results * RERANK_FACTOR, RERANK_MIN)) if rerank else k
+            top = np.argpartition(-coarse, candidates - 1)[:candidates]
+            if rerank:
+                # Exact float32 re-rank of the candidates only
+                top = np.sort(top)
+                scores = self._exact[top] @ q
+            else:
+                scores = coarse[top]
+            best = np.argsort(-scores)[:k]
+            return [(self._id_of[int(top[i])], float(scores[i])) for i in best]
+
+    def stats(self) -> Dict[str, Any]:
+        """Row counts and vector memory footprint vs plain float32."""
+        with self._lock:
+            self._conn()
+            dim = self.dim or 0
+            code_bytes = self.size * dim * (1 if self.dtype == "int8" else 2)
+            if self.dtype == "int8":
+                code_bytes += self.size * 4
+            float32_bytes = self.size * dim * 4
+            return {
+                "dtype": self.dtype,
+                "dim": self.dim,
+                "vectors": len(self._row_of),
+                "dead_rows": self.size - len(self._row_of),
+                "scan_bytes": code_bytes,
+                "float32_bytes": float32_bytes,
+                "saved_ratio": round(1 - code_bytes / float32_bytes, 3) if float32_bytes else 0.0,
+            }
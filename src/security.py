@@ -1,7 +1,8 @@
 """
 MEGANX Security Module
 ======================
-Rate-limiting and kill-switch for safe autonomous operation.
+Rate-limiting, kill-switch and file path confinement for safe autonomous
+operation.
 """
 
 import time
@@ -107,6 +108,26 @@ class KillSwitch:
             f.write(json.dumps(log_entry) + "\n")
 
 
+# ============================================================================
+# PATH CONFINEMENT
+# ============================================================================
+
+class PathNotAllowed(ValueError):
+    """Raised when a tool-supplied path resolves outside its allowed root."""
+
+
+def confine_path(path: str, root: str) -> Path:
+    """
+    Resolve a tool-supplied path (relative ones against `root`, symlinks and
+    ".." followed) and reject it unless it lies inside `root`.
+    """
+    base = Path(root).expanduser().resolve()
+    target = (base / Path(path).expanduser()).resolve()
+    if not target.is_relative_to(base):
+        raise PathNotAllowed(f"{path} is outside the allowed directory {base}")
+    return target
+
+
 # ============================================================================
 # GLOBAL INSTANCES
 # ============================================================================
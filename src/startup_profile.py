@@ -0,0 +1,75 @@
+"""
+MEGANX Startup Profile
+======================
+Measures server startup: time to import the server module, time spent
+lazily loading heavy subsystems (Playwright, ChromaDB, embedding model), and
+a `python -X importtime` breakdown on demand.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Process-relative clock: imported first thing by the server module
+PROCESS_START = time.perf_counter()
+
+# label -> seconds, in the order things were loaded
+_timings: Dict[str, float] = {}
+
+
+def record(label: str, seconds: float) -> None:
+    """Record how long a startup step took."""
+    _timings[label] = seconds
+
+
+@contextmanager
+def timed(label: str):
+    """Time a block (e.g. a lazy import) under `label`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(label, time.perf_counter() - started)
+
+
+def timings() -> Dict[str, float]:
+    return dict(_timings)
+
+
+def import_time_breakdown(module: str = "meganx_mcp_server", top: int = 15) -> List[Tuple[str, float, float]]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and return the
+    slowest top-level packages as (name, self_ms, cumulative_ms).
+    """
+    src_dir = Path(__file__).resolve().parent
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=src_dir, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": str(src_dir)},
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header row
+        name = parts[2].rstrip()
+        # One separator space, then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((name.strip(), self_us / 1000, cumulative_us / 1000))
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows[:top]
+
+
+def format_breakdown(rows: List[Tuple[str, float, float]]) -> str:
+    lines = [f"{'module':<40} {'self ms':>9} {'cumul. ms':>10}"]
+    lines += [f"{name:<40} {self_ms:>9.1f} {cumulative_ms:>10.1f}" for name, self_ms, cumulative_ms in rows]
+    return "\n".join(lines)
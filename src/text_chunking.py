@@ -0,0 +1,78 @@
+"""
+MEGANX Text Chunking
+====================
+Whitespace normalization and token-bounded chunking for text that has to fit
+a small LLM context (Sparrow runs with 2048 tokens).
+"""
+
+import math
+import re
+from typing import List
+
+# all-MiniLM / Llama tokenizers average ~4 characters per token on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no tokenizer load)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse runs of spaces inside lines and runs of blank lines between them."""
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def _split_long(paragraph: str, max_chars: int) -> List[str]:
+    """Split a paragraph that alone exceeds the budget at word boundaries."""
+    pieces, current = [], ""
+    for word in paragraph.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: int = 512, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split text into chunks of at most ~max_tokens, preferring paragraph and
+    line boundaries. With `overlap_tokens`, each chunk repeats the tail of the
+    previous one so context isn't lost at the cut.
+    """
+    max_chars = max(1, max_tokens) * CHARS_PER_TOKEN
+    overlap_chars = min(max(0, overlap_tokens) * CHARS_PER_TOKEN, max_chars // 2)
+    # Leave room for the overlap tail in front of every unit
+    unit_chars = max_chars - overlap_chars
+    units: List[str] = []
+    for line in text.split("\n"):
+        units.extend(_split_long(line, unit_chars) if len(line) > unit_chars else [line])
+
+    chunks, current = [], ""
+    for unit in units:
+        candidate = f"{current}\n{unit}" if current else unit
+        if len(candidate) > max_chars and current.strip():
+            chunks.append(current.strip())
+            tail = current[-overlap_chars:] if overlap_chars else ""
+            if tail and " " in tail:
+                tail = tail[tail.index(" ") + 1:]
+            current = f"{tail}\n{unit}" if tail else unit
+            if len(current) > max_chars:
+                current = unit
+        else:
+            current = candidate
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
@@ -0,0 +1,103 @@
+"""
+MEGANX TTL Cache
+================
+In-process cache with per-entry TTL, LRU eviction and a memory cap.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Sentinel for "not cached" (None is a valid cached value)
+MISS = object()
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire after `ttl` seconds.
+
+    Bounded both by entry count and by the approximate size of the cached
+    values (`max_bytes`), whichever is hit first. Thread-safe.
+    """
+
+    def __init__(self, ttl: float = 120.0, max_entries: int = 512, max_bytes: int = 8 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(value: Any) -> int:
+        """Approximate memory footprint of a cached value."""
+        if isinstance(value, (str, bytes)):
+            return len(value)
+        if isinstance(value, (list, tuple)):
+            return sys.getsizeof(value) + sum(TTLCache._sizeof(item) for item in value)
+        return sys.getsizeof(value)
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or MISS."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+            value, expires_at, size = entry
+            if time.time() >= expires_at:
+                self._pop(key)
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache a value, evicting least-recently-used entries to stay in bounds."""
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, time.time() + (ttl or self.ttl), size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches `predicate`. Returns the count."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                self._pop(key)
+            return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry (stats are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,640 @@
+"""
+MEGANX Vector Memory
+====================
+ChromaDB-backed semantic memory used by the memory_* MCP tools.
+
+The client, collection and embedding model are created once, behind a lock,
+so a background warm-up and the first tool call never race to initialize
+them: whoever comes second simply waits for the first to finish. chromadb
+itself is only imported then, keeping server startup light.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+import startup_profile
+from embedding_cache import EmbeddingCache, embedding_cache
+from env_config import env_int, env_float
+from ttl_cache import TTLCache, MISS
+from keyword_index import KeywordIndex, reciprocal_rank_fusion
+from metadata_index import MetadataIndex, TAG_PREFIX
+from quantized_store import QuantizedVectorStore, QUANTIZED_DTYPES
+
+# Metadata values Chroma accepts
+METADATA_TYPES = (str, int, float, bool)
+
+RECALL_MODES = ("vector", "hybrid", "keyword")
+
+# Where vectors live: Chroma's HNSW index, or the compact quantized store
+VECTOR_STORES = ("chroma",) + QUANTIZED_DTYPES
+
+# With a quantized store Chroma only keeps documents + metadata; this 1-dim
+# stand-in keeps its own vector index negligible
+PLACEHOLDER_EMBEDDING = [0.0]
+
+# Candidates pulled from each ranking before fusion, per requested result
+HYBRID_CANDIDATES = 4
+
+# Relative times for filters: "30m", "1h", "2d", "1w"
+RELATIVE_TIME_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhdw])$")
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Relative times are rounded down to 1/60 of their span (at most a minute), so
+# repeated "since=1h" recalls share a recall cache key instead of missing every time
+RELATIVE_TIME_STEP = 60.0
+
+
+def parse_time(value: Any) -> Optional[float]:
+    """
+    Epoch seconds from an epoch number, an ISO 8601 string (UTC unless it
+    carries an offset) or a relative age ("1h" = an hour ago).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().lower()
+    match = RELATIVE_TIME_RE.match(text)
+    if match:
+        span = float(match.group(1)) * TIME_UNITS[match.group(2)]
+        now = time.time()
+        step = min(RELATIVE_TIME_STEP, span / 60)
+        if step > 0:
+            now -= now % step
+        return now - span
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    iso = str(value).strip()
+    if iso[-1:] in ("Z", "z"):
+        # fromisoformat only accepts a "Z" suffix from Python 3.11 on
+        iso = iso[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(iso)
+    except ValueError:
+        raise ValueError(f"Unrecognized time {value!r}: use epoch seconds, ISO 8601 or an age like 30m/1h/2d")
+    if parsed.tzinfo is None:
+        # Naive times would otherwise follow the server's local zone
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def normalize_tag(tag: str) -> str:
+    return "_".join(str(tag).strip().lower().split())
+
+
+def make_filters(source: Optional[str] = None, tags: Optional[List[str]] = None, since: Any = None,
+                 until: Any = None, session: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Normalized metadata filters (None when nothing is filtered)."""
+    filters = {
+        "source": source or None,
+        "session": session or None,
+        "tags": tuple(sorted({normalize_tag(t) for t in tags if str(t).strip()})) if tags else None,
+        "since": parse_time(since),
+        "until": parse_time(until),
+    }
+    filters = {k: v for k, v in filters.items() if v}
+    return filters or None
+
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Translate filters into a Chroma `where` clause."""
+    if not filters:
+        return None
+    conditions: List[Dict[str, Any]] = []
+    for key in ("source", "session"):
+        if key in filters:
+            conditions.append({key: filters[key]})
+    if "since" in filters:
+        conditions.append({"timestamp": {"$gte": filters["since"]}})
+    if "until" in filters:
+        conditions.append({"timestamp": {"$lte": filters["until"]}})
+    for tag in filters.get("tags", ()):
+        conditions.append({f"{TAG_PREFIX}{tag}": True})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+_embedding_function = None
+_embedding_lock = threading.Lock()
+
+
+def shared_embedding_function():
+    """
+    The process-wide all-MiniLM-L6-v2 embedder. Every VectorMemory (one per
+    open namespace) uses it, so the ONNX session is loaded once, not once per
+    handle, and survives namespace handles being evicted and reopened.
+    """
+    global _embedding_function
+    with _embedding_lock:
+        if _embedding_function is None:
+            from chromadb.utils import embedding_functions
+            _embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        return _embedding_function
+
+
+def expand_tags(metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn a "tags" list in metadata into boolean tag_<name> keys Chroma can filter on."""
+    metadata = dict(metadata or {})
+    tags = metadata.pop("tags", None)
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    for tag in tags or ():
+        if str(tag).strip():
+            metadata[f"{TAG_PREFIX}{normalize_tag(tag)}"] = True
+    return metadata
+
+
+class CollectionNotFound(LookupError):
+    """Raised by ensure(create=False) when the collection does not exist yet."""
+
+
+class VectorMemory:
+    """Persistent ChromaDB collection with the default all-MiniLM-L6-v2 embedder."""
+
+    def __init__(self, path: Optional[str] = None, collection_name: str = "meganx_memories", batch_size: Optional[int] = None,
+                 cache: Optional[EmbeddingCache] = embedding_cache, vector_store: Optional[str] = None):
+        self.path = path or os.getenv("CHROMA_DB_PATH", "./nexus_memory")
+        self.collection_name = collection_name
+        self.batch_size = batch_size or env_int("MEMORY_EMBED_BATCH_SIZE", 64)
+        self.client = None
+        self.collection = None
+        self.embedding_function = None
+        self.cache = cache
+        self.keywords: Optional[KeywordIndex] = None
+        self.metadata_index: Optional[MetadataIndex] = None
+        self.vector_store = (vector_store or os.getenv("MEMORY_VECTOR_STORE", "chroma")).lower()
+        if self.vector_store not in VECTOR_STORES:
+            raise ValueError(f"MEMORY_VECTOR_STORE must be one of {', '.join(VECTOR_STORES)}")
+        self.vectors: Optional[QuantizedVectorStore] = None
+        # Bumped on every write; part of the recall cache key, so results
+        # computed before a write are never served after it
+        self.version = 0
+        self.recall_cache = TTLCache(
+            ttl=env_float("MEMORY_RECALL_CACHE_TTL", 300.0),
+            max_entries=env_int("MEMORY_RECALL_CACHE_MAX_ENTRIES", 256),
+        )
+        self._init_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._seq_lock = threading.Lock()
+        # Seeded from the clock so IDs keep increasing across restarts
+        self._seq = time.time_ns() // 1000
+
+    @property
+    def ready(self) -> bool:
+        return self.collection is not None
+
+    def ensure(self, create: bool = True) -> None:
+        """
+        Open the client and collection (first caller initializes, others wait).
+        With create=False a missing collection raises CollectionNotFound
+        instead of being created, and nothing is written to disk.
+        """
+        if self.ready:
+            return
+        with self._init_lock:
+            if self.ready:
+                return
+            with startup_profile.timed("chromadb import"):
+                import chromadb
+            with startup_profile.timed("chromadb open"):
+                client = chromadb.PersistentClient(path=self.path)
+            # Default embedding function (all-MiniLM-L6-v2), shared by every handle
+            ef = shared_embedding_function()
+            # A quantized store uses its own collection (its Chroma vectors are placeholders)
+            name = self.collection_name if self.vector_store == "chroma" else f"{self.collection_name}_{self.vector_store}"
+            if create:
+                collection = client.get_or_create_collection(name=name, embedding_function=ef)
+            else:
+                existing = {getattr(c, "name", c) for c in client.list_collections()}
+                if name in existing:
+                    collection = client.get_collection(name=name, embedding_function=ef)
+                elif self.collection_name in existing:
+                    # Only the float32 collection so far: opening migrates it
+                    collection = client.get_or_create_collection(name=name, embedding_function=ef)
+                else:
+                    raise CollectionNotFound(f"No collection {self.collection_name!r}")
+            vectors = None
+            if self.vector_store != "chroma":
+                vectors = QuantizedVectorStore(os.path.join(self.path, f"{name}_vectors"), self.vector_store)
+                # Copy the float32 collection once: a store emptied later (pruned,
+                # deleted) must stay empty instead of being refilled from it
+                if not vectors.migrated():
+                    if collection.count() == 0:
+                        self._migrate(client, ef, collection, vectors)
+                    vectors.mark_migrated()
+                    self._drop_source(client)
+            keywords = KeywordIndex(os.path.join(self.path, f"{name}_keywords.sqlite3"))
+            metadata_index = MetadataIndex(os.path.join(self.path, f"{name}_metadata.sqlite3"))
+            # First run on an existing store (or an index fell behind): rebuild it.
+            # Memories from before content addressing get their hash, once, so dedup sees them
+            count = collection.count()
+            rebuild = keywords.count() != count or metadata_index.count() != count
+            backfill = not metadata_index.marker("content_hash")
+            if rebuild:
+                keywords.clear()
+                metadata_index.clear()
+            if rebuild or backfill:
+                # Paged, so a large store is never loaded whole
+                page_size = client.get_max_batch_size()
+                for offset in range(0, count, page_size):
+                    page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                    if backfill:
+                        self._backfill_hashes(collection, page)
+                    if rebuild:
+                        keywords.add(page["ids"], page["documents"])
+                        metadata_index.add(page["ids"], page["metadatas"])
+                if backfill:
+                    metadata_index.set_marker("content_hash")
+            self.keywords = keywords
+            self.metadata_index = metadata_index
+            self.vectors = vectors
+            self.embedding_function = ef
+            self.client = client
+            self.collection = collection
+
+    def _backfill_hashes(self, collection, entries: Dict[str, Any]) -> None:
+        """Add content_hash to a page of entries stored without one (updates `entries` in place)."""
+        missing = [i for i, meta in enumerate(entries["metadatas"]) if not (meta or {}).get("content_hash")]
+        for i in missing:
+            entries["metadatas"][i] = dict(entries["metadatas"][i] or {},
+                                           content_hash=self.content_hash(entries["documents"][i]))
+        if missing:
+            collection.update(ids=[entries["ids"][i] for i in missing],
+                              metadatas=[entries["metadatas"][i] for i in missing])
+            print(f"[MEMORY] Added content hashes to {len(missing)} older memories", file=sys.stderr)
+
+    def _migrate(self, client, ef, target, vectors: QuantizedVectorStore) -> None:
+        """First switch to a quantized store: copy the float32 collection over, without re-embedding."""
+        try:
+            source = client.get_collection(self.collection_name, embedding_function=ef)
+        except Exception:
+            return  # nothing to migrate
+        total = source.count()
+        if not total:
+            return
+        print(f"[MEMORY] Moving {total} memories to the {self.vector_store} vector store", file=sys.stderr)
+        page_size = min(1000, client.get_max_batch_size())
+        for offset in range(0, total, page_size):
+            page = source.get(limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+            vectors.add(page["ids"], page["embeddings"])
+            target.add(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"],
+                       embeddings=[PLACEHOLDER_EMBEDDING] * len(page["ids"]))
+
+    def _drop_source(self, client) -> None:
+        """Delete the float32 collection once migrated: it is stale from then on and only doubles disk use."""
+        existing = {getattr(c, "name", c) for c in client.list_collections()}
+        if self.collection_name in existing:
+            client.delete_collection(self.collection_name)
+            print(f"[MEMORY] Dropped the migrated float32 collection {self.collection_name}", file=sys.stderr)
+
+    def warm_up(self) -> float:
+        """Open the store and load + prime the embedding model. Returns seconds taken."""
+        started = time.perf_counter()
+        self.ensure()
+        # The ONNX session is created lazily on the first call
+        with startup_profile.timed("embedding model load"):
+            self.embedding_function(["warm-up"])
+        return time.perf_counter() - started
+
+    # ========================================================================
+    # READ / WRITE
+    # ========================================================================
+
+    def embed(self, texts: List[str]) -> List[Any]:
+        """
+        Embed texts in batches of `batch_size` (one ONNX run per batch).
+        Texts found in the embedding cache skip the model entirely.
+        """
+        self.ensure()
+        if self.cache is None:
+            return self._embed_uncached(texts)
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            fresh = dict(zip(missing, self._embed_uncached(list(missing.values()))))
+            self.cache.put_many(fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    def _embed_uncached(self, texts: List[str]) -> List[Any]:
+        vectors: List[Any] = []
+        for i in range(0, len(texts), self.batch_size):
+            vectors.extend(self.embedding_function(texts[i:i + self.batch_size]))
+        return vectors
+
+    def store(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Add one document. Returns its ID."""
+        item = self.store_many([content], [metadata] if metadata else None)[0]
+        if "error" in item:
+            raise ValueError(item["error"])
+        return item["id"]
+
+    @staticmethod
+    def content_hash(content: str) -> str:
+        """Stable content address for dedup."""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def validate(content: Any, metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Error message for an item Chroma would reject, or None."""
+        if not isinstance(content, str) or not content.strip():
+            return "Content must be a non-empty string"
+        metadata = expand_tags(metadata)
+        if not all(isinstance(v, METADATA_TYPES) for v in metadata.values()):
+            return "Metadata values must be str, int, float or bool"
+        return None
+
+    def next_id(self, content: str) -> str:
+        """Reserve an ID for content that will be written later (write-behind)."""
+        return self._next_id(self.content_hash(content))
+
+    def _next_id(self, digest: str) -> str:
+        """Content hash plus a monotonic sequence: unique even within one second."""
+        with self._seq_lock:
+            self._seq += 1
+            return f"mem_{digest[:16]}_{self._seq:x}"
+
+    def _existing_ids(self, digests: List[str]) -> Dict[str, str]:
+        """Map content hashes that are already stored to their IDs."""
+        found = self.collection.get(where={"content_hash": {"$in": digests}}, include=["metadatas"])
+        return {meta["content_hash"]: mem_id for mem_id, meta in zip(found["ids"], found["metadatas"])}
+
+    def existing_ids(self, digests: List[str]) -> Dict[str, str]:
+        """Map the content hashes among `digests` that are already stored to their IDs."""
+        self.ensure()
+        found: Dict[str, str] = {}
+        page = self.client.get_max_batch_size()
+        for start in range(0, len(digests), page):
+            found.update(self._existing_ids(digests[start:start + page]))
+        return found
+
+    def stored_hashes(self, digests: List[str]) -> Set[str]:
+        """The content hashes among `digests` that are already stored."""
+        return set(self.existing_ids(digests))
+
+    def store_many(self, contents: List[str], metadatas: Optional[List[Optional[Dict[str, Any]]]] = None,
+                   ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Add many documents with bulk embedding and bulk collection writes.
+        Content already in the collection (same hash) is not re-embedded: its
+        existing ID is returned with "duplicate": True and any explicitly
+        passed metadata is merged into the stored entry. Content repeated
+        within the call is stored once, with the repeats' metadata merged the
+        same way.
+        `ids` (from next_id) are used for new entries instead of fresh ones.
+        Returns one {"id": ...} or {"error": ...} per input, in order.
+        """
+        self.ensure()
+        if metadatas is not None and len(metadatas) != len(contents):
+            raise ValueError(f"Got {len(metadatas)} metadatas for {len(contents)} contents")
+        if ids is not None and len(ids) != len(contents):
+            raise ValueError(f"Got {len(ids)} ids for {len(contents)} contents")
+
+        metadatas = metadatas or [None] * len(contents)
+        items: List[Dict[str, Any]] = [{} for _ in contents]
+        pending = []  # (index, hash, document, metadata, explicit metadata)
+        first_seen: Dict[str, tuple] = {}
+        repeats = []  # (index, index of first occurrence in this call)
+        now = time.time()
+        for i, content in enumerate(contents):
+            explicit = expand_tags(metadatas[i])
+            metadata = {"timestamp": now, "source": "mcp_agent", **explicit}
+            error = self.validate(content, metadata)
+            if error:
+                items[i] = {"error": error}
+            else:
+                digest = self.content_hash(content)
+                if digest in first_seen:
+                    # Same merge as a duplicate across calls: later explicit metadata wins
+                    first = first_seen[digest]
+                    first[3].update(explicit)
+                    first[4].update(explicit)
+                    repeats.append((i, first[0]))
+                    continue
+                metadata["content_hash"] = digest
+                first_seen[digest] = (i, digest, content, metadata, explicit)
+                pending.append(first_seen[digest])
+
+        # Embed and write in batches; a failing batch only fails its own items
+        write_batch = min(self.batch_size, self.client.get_max_batch_size())
+        for start in range(0, len(pending), write_batch):
+            batch = pending[start:start + write_batch]
+            try:
+                with self._write_lock:
+                    existing = self._existing_ids([b[1] for b in batch])
+                    new = [b for b in batch if b[1] not in existing]
+                    updates = [(existing[b[1]], b[4]) for b in batch if b[1] in existing and b[4]]
+                    new_ids = [ids[b[0]] if ids else self._next_id(b[1]) for b in new]
+                    if new:
+                        documents = [b[2] for b in new]
+                        self._write(new_ids, documents, [b[3] for b in new], self.embed(documents))
+                    if updates:
+                        # Metadata-only upsert: no re-embedding
+                        self.collection.update(ids=[u[0] for u in updates], metadatas=[u[1] for u in updates])
+                        merged = self.collection.get(ids=[u[0] for u in updates], include=["metadatas"])
+                        self.metadata_index.add(merged["ids"], merged["metadatas"])
+                    if new or updates:
+                        self._bump_version()
+                for (i, _, _, _, _), mem_id in zip(new, new_ids):
+                    items[i] = {"id": mem_id}
+                for i, digest, _, _, _ in batch:
+                    if digest in existing:
+                        items[i] = {"id": existing[digest], "duplicate": True}
+            except Exception as e:
+                for i, _, _, _, _ in batch:
+                    items[i] = {"error": str(e)}
+
+        for i, first in repeats:
+            items[i] = {**items[first], "duplicate": True} if "id" in items[first] else dict(items[first])
+        return items
+
+    def _write(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: List[Any]) -> None:
+        """Add embedded entries to the collection and every index (caller holds the write lock)."""
+        if self.vectors is not None:
+            self.vectors.add(ids, embeddings)
+            embeddings = [PLACEHOLDER_EMBEDDING] * len(ids)
+        self.collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        self.keywords.add(ids, documents)
+        self.metadata_index.add(ids, metadatas)
+
+    def import_entries(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                       embeddings: Any) -> Dict[str, int]:
+        """
+        Bulk-load already embedded entries (snapshot import), keeping their IDs.
+        Entries whose ID or content is already stored are skipped.
+        """
+        self.ensure()
+        metadatas = [dict(meta or {}) for meta in metadatas]
+        for document, meta in zip(documents, metadatas):
+            meta.setdefault("content_hash", self.content_hash(document))
+        write_batch = self.client.get_max_batch_size()
+        imported = 0
+        with self._write_lock:
+            for start in range(0, len(ids), write_batch):
+                end = start + write_batch
+                batch_ids = ids[start:end]
+                taken = set(self.collection.get(ids=batch_ids, include=[])["ids"])
+                taken_hashes = set(self._existing_ids(list({m["content_hash"] for m in metadatas[start:end]})))
+                keep = []
+                for i in range(start, min(end, len(ids))):
+                    digest = metadatas[i]["content_hash"]
+                    if ids[i] in taken or digest in taken_hashes:
+                        continue
+                    taken_hashes.add(digest)
+                    keep.append(i)
+                if keep:
+                    self._write([ids[i] for i in keep], [documents[i] for i in keep],
+                                [metadatas[i] for i in keep], [embeddings[i] for i in keep])
+                    imported += len(keep)
+            if imported:
+                self._bump_version()
+        return {"imported": imported, "skipped": len(ids) - imported}
+
+    def all_ids(self) -> List[str]:
+        """Every stored ID, newest first."""
+        self.ensure()
+        return self.metadata_index.query()
+
+    def export_chunk(self, ids: List[str]) -> Tuple[List[str], List[str], List[Dict[str, Any]], Any]:
+        """IDs, documents, metadata and float32 vectors for `ids` (deleted IDs are dropped)."""
+        import numpy as np
+        self.ensure()
+        include = ["documents", "metadatas"] if self.vectors is not None else ["documents", "metadatas", "embeddings"]
+        found = self.collection.get(ids=ids, include=include)
+        if self.vectors is not None:
+            vectors = self.vectors.get(found["ids"])
+        else:
+            vectors = np.asarray(found["embeddings"], dtype=np.float32)
+        return found["ids"], found["documents"], found["metadatas"], vectors
+
+    def _bump_version(self) -> None:
+        """Record a write: cached recall results for older versions are dropped."""
+        self.version += 1
+        version = self.version
+        self.recall_cache.invalidate(lambda key: key[-1] != version)
+
+    def recall(self, query: str, n_results: int = 3, mode: str = "vector",
+               filters: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Search memories. Returns the matching documents, best first.
+        vector: nearest neighbours; keyword: BM25 only (no embedding);
+        hybrid: both rankings fused with reciprocal rank fusion.
+        `filters` (from make_filters) restrict the search to matching metadata.
+        Results are cached until the next write.
+        """
+        if mode not in RECALL_MODES:
+            raise ValueError(f"mode must be one of {', '.join(RECALL_MODES)}")
+        self.ensure()
+        # The embedder is uncased and BM25 lower-cases, so case and spacing don't change results
+        key = (" ".join(query.lower().split()), n_results, mode,
+               tuple(sorted((filters or {}).items())), self.version)
+        cached = self.recall_cache.get(key)
+        if cached is not MISS:
+            return list(cached)
+        documents = self._search(query, n_results, mode, filters)
+        self.recall_cache.put(key, documents)
+        return list(documents)
+
+    def _nearest(self, query: str, n_results: int, filters: Optional[Dict[str, Any]],
+                 allowed: Optional[set]) -> Tuple[List[str], Dict[str, str]]:
+        """Vector search: IDs best first, plus whatever documents came back with them."""
+        if self.vectors is None:
+            results = self.collection.query(
+                query_embeddings=self.embed([query]),
+                n_results=n_results,
+                where=build_where(filters),
+            )
+            return results['ids'][0], dict(zip(results['ids'][0], results['documents'][0]))
+        hits = self.vectors.search(self.embed([query])[0], n_results, allowed)
+        return [doc_id for doc_id, _ in hits], {}
+
+    def _search(self, query: str, n_results: int, mode: str, filters: Optional[Dict[str, Any]]) -> List[str]:
+        # Filters become an ID set for BM25 and the quantized store (Chroma takes a where clause)
+        allowed = None
+        if filters and (mode != "vector" or self.vectors is not None):
+            allowed = set(self.metadata_index.query(filters))
+        if mode == "vector":
+            ranked, documents = self._nearest(query, n_results, filters, allowed)
+        else:
+            candidates = n_results * HYBRID_CANDIDATES if mode == "hybrid" else n_results
+            keyword_ids = [doc_id for doc_id, _ in self.keywords.search(query, candidates, allowed)]
+            documents: Dict[str, str] = {}
+            ranked = keyword_ids
+            if mode == "hybrid":
+                vector_ids, documents = self._nearest(query, candidates, filters, allowed)
+                ranked = reciprocal_rank_fusion([vector_ids, keyword_ids])
+        ranked = ranked[:n_results]
+        missing = [doc_id for doc_id in ranked if doc_id not in documents]
+        if missing:
+            found = self.collection.get(ids=missing, include=["documents"])
+            documents.update(zip(found['ids'], found['documents']))
+        return [documents[doc_id] for doc_id in ranked if doc_id in documents]
+
+    def recent(self, n_results: int = 10, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Newest memories matching `filters`, from the metadata index (no vector query)."""
+        self.ensure()
+        return self.get(self.metadata_index.query(filters, limit=n_results))
+
+    def get(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Documents and metadata for `ids`, in the given order (unknown IDs are skipped)."""
+        self.ensure()
+        by_id: Dict[str, Dict[str, Any]] = {}
+        page_size = self.client.get_max_batch_size()
+        for start in range(0, len(ids), page_size):
+            found = self.collection.get(ids=ids[start:start + page_size], include=["documents", "metadatas"])
+            for mem_id, doc, meta in zip(found["ids"], found["documents"], found["metadatas"]):
+                by_id[mem_id] = {"id": mem_id, "document": doc, "metadata": meta}
+        return [by_id[mem_id] for mem_id in ids if mem_id in by_id]
+
+    def delete(self, ids: List[str]) -> int:
+        """Remove memories from the collection and every index, in bulk. Returns the count."""
+        self.ensure()
+        if not ids:
+            return 0
+        batch = self.client.get_max_batch_size()
+        with self._write_lock:
+            for start in range(0, len(ids), batch):
+                chunk = ids[start:start + batch]
+                self.collection.delete(ids=chunk)
+                self.keywords.remove(chunk)
+                self.metadata_index.remove(chunk)
+                if self.vectors is not None:
+                    self.vectors.remove(chunk)
+            self._bump_version()
+        return len(ids)
+
+    def vacuum(self) -> Dict[str, Any]:
+        """Reclaim space after deletes: VACUUM the side indexes, rewrite the quantized store."""
+        self.ensure()
+        with self._write_lock:
+            self.keywords.vacuum()
+            self.metadata_index.vacuum()
+            reclaimed = self.vectors.compact() if self.vectors is not None else 0
+        return {"indexes_vacuumed": True, "vector_rows_reclaimed": reclaimed}
+
+    def stats(self) -> Dict[str, Any]:
+        """Collection size and embedding cache statistics."""
+        self.ensure()
+        return {
+            "collection": self.collection.name,
+            "memories": self.collection.count(),
+            "version": self.version,
+            "embedding_cache": self.cache.stats() if self.cache else None,
+            "recall_cache": self.recall_cache.stats(),
+            "vector_store": self.vectors.stats() if self.vectors else "chroma",
+        }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+vector_memory = VectorMemory()
@@ -0,0 +1,295 @@
+"""
+MEGANX Write-Behind Queue
+=========================
+Asynchronous memory_store: writes are validated, journaled and acknowledged
+with their ID at once (content already stored or queued gets the existing
+ID), then embedded and committed to ChromaDB in batches by
+a background worker thread.
+
+Every enqueued write is appended to a JSONL journal before it is
+acknowledged and marked done once committed, so writes still pending when
+the process dies are replayed on the next start. Writes the worker fails to
+commit (content is validated up front, so these are embedder or storage
+errors) stay in the journal and are retried on the next start too. The
+journal is compacted whenever the queue drains. When `max_pending` writes
+are waiting, enqueue blocks (backpressure) instead of letting the backlog
+grow without bound.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+from env_config import env_int, env_float, env_bool
+from vector_memory import VectorMemory, vector_memory
+from memory_namespaces import MemoryNamespaces, NoSuchNamespace, memory_namespaces, normalize_namespace
+
+
+class QueueFull(RuntimeError):
+    """Raised when the write queue stays full for longer than the enqueue timeout."""
+
+
+class WriteBehindQueue:
+    """Journaled write queue drained by one worker thread in batches."""
+
+    def __init__(self, memory: VectorMemory, journal_path: Optional[str] = None,
+                 max_pending: int = 1000, batch_size: Optional[int] = None, linger: float = 0.05,
+                 namespaces: Optional[MemoryNamespaces] = None):
+        self.memory = memory
+        # Writes to other namespaces are committed through their handles
+        self.namespaces = namespaces
+        # Next to the collection by default, so it lives on the same volume
+        self.journal_path = Path(journal_path or os.path.join(memory.path, "write_journal.jsonl"))
+        self.max_pending = max_pending
+        self.batch_size = batch_size or memory.batch_size
+        # Short wait for more writes before committing a partial batch
+        self.linger = linger
+        self._queue: deque = deque()  # (id, content, metadata, namespace)
+        # (namespace, content hash) -> ID of a queued write, so repeats reuse it
+        self._reserved: Dict[tuple, str] = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._retry: List[tuple] = []  # failed writes, kept for the next start
+        self.committed = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    # ========================================================================
+    # JOURNAL
+    # ========================================================================
+
+    def _journal(self, records: List[Dict[str, Any]]) -> None:
+        with self._journal_lock:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    @staticmethod
+    def _add_record(item: tuple) -> Dict[str, Any]:
+        mem_id, content, metadata, namespace = item
+        record = {"op": "add", "id": mem_id, "content": content, "metadata": metadata}
+        if namespace:
+            record["namespace"] = namespace
+        return record
+
+    def _replay(self) -> List[tuple]:
+        """Writes journaled but never marked done (e.g. after a crash)."""
+        if not self.journal_path.exists():
+            return []
+        pending: Dict[str, tuple] = {}
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line
+                if record.get("op") == "add":
+                    pending[record["id"]] = (record["id"], record["content"], record.get("metadata"),
+                                             record.get("namespace"))
+                elif record.get("op") == "done":
+                    for mem_id in record["ids"]:
+                        pending.pop(mem_id, None)
+        return list(pending.values())
+
+    # ========================================================================
+    # QUEUE
+    # ========================================================================
+
+    def start(self) -> int:
+        """Replay the journal and start the worker. Returns the number of replayed writes."""
+        with self._cond:
+            if self._worker is not None:
+                return 0
+            replayed = self._replay()
+            self._queue.extend(replayed)
+            for item in replayed:
+                self._reserved.setdefault(self._key(item[1], item[3]), item[0])
+            self._worker = threading.Thread(target=self._run, name="memory-write-behind", daemon=True)
+            self._worker.start()
+            self._cond.notify_all()
+        if replayed:
+            print(f"[WRITE-BEHIND] Replaying {len(replayed)} journaled writes", file=sys.stderr)
+        return len(replayed)
+
+    def _key(self, content: str, namespace: Optional[str]) -> tuple:
+        return namespace, self.memory.content_hash(content)
+
+    def _stored_id(self, key: tuple) -> Optional[str]:
+        """ID of already-stored content with this (namespace, hash), if any."""
+        namespace, digest = key
+        if not self.namespaces:
+            return self.memory.existing_ids([digest]).get(digest)
+        try:
+            return self.namespaces.read(namespace, VectorMemory.existing_ids, [digest]).get(digest)
+        except NoSuchNamespace:
+            return None
+
+    def enqueue(self, content: str, metadata: Optional[Dict[str, Any]] = None, timeout: float = 30.0,
+                namespace: Optional[str] = None) -> str:
+        """
+        Journal a write and queue it. Returns the memory ID it is stored
+        under: content already stored or queued resolves to that entry's ID
+        (its metadata is merged in when the write commits).
+        Blocks while the queue is full; raises QueueFull after `timeout`.
+        """
+        error = self.memory.validate(content, metadata)
+        if error:
+            raise ValueError(error)
+        namespace = normalize_namespace(namespace)
+        if namespace and not self.namespaces:
+            raise ValueError("This write queue only serves the default namespace")
+        self.start()
+        key = self._key(content, namespace)
+        with self._cond:
+            mem_id = self._reserved.get(key)
+        if mem_id is None:
+            # Outside the queue lock: this may open the namespace
+            mem_id = self._stored_id(key)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._queue) + self._in_flight >= self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QueueFull(f"Write queue full ({self.max_pending} pending)")
+                self._cond.wait(remaining)
+            if mem_id is None:
+                mem_id = self._reserved.setdefault(key, self.memory.next_id(content))
+            # Journal before acknowledging, under the queue lock so the worker
+            # can't truncate the journal in between
+            self._journal([self._add_record((mem_id, content, metadata, namespace))])
+            self._queue.append((mem_id, content, metadata, namespace))
+            self._cond.notify_all()
+        return mem_id
+
+    def _next_batch(self) -> List[tuple]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            if len(self._queue) < self.batch_size and self.linger:
+                self._cond.wait(self.linger)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._in_flight = len(batch)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            results = self._commit(batch)
+            for result in results:
+                if "error" in result:
+                    self.failed += 1
+                    self.last_error = result["error"]
+                elif result.get("duplicate"):
+                    self.duplicates += 1
+                else:
+                    self.committed += 1
+            failed = [item for item, result in zip(batch, results) if "error" in result]
+            if failed:
+                print(f"[WRITE-BEHIND] {len(failed)} writes failed: {self.last_error}", file=sys.stderr)
+            with self._cond:
+                self._in_flight = 0
+                self._retry.extend(failed)
+                for item in batch:
+                    key = self._key(item[1], item[3])
+                    if self._reserved.get(key) == item[0]:
+                        del self._reserved[key]
+                if self._queue:
+                    done = [item[0] for item, result in zip(batch, results) if "error" not in result]
+                    self._journal([{"op": "done", "ids": done}])
+                else:
+                    self._compact()
+                self._cond.notify_all()
+
+    def _commit(self, batch: List[tuple]) -> List[Dict[str, Any]]:
+        """store_many per namespace in the batch; results in batch order."""
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, item in enumerate(batch):
+            groups.setdefault(item[3], []).append(i)
+        results: List[Dict[str, Any]] = [{} for _ in batch]
+        for namespace, positions in groups.items():
+            items = [batch[i] for i in positions]
+            handle = self.namespaces.use(namespace) if self.namespaces else nullcontext(self.memory)
+            try:
+                with handle as memory:
+                    stored = memory.store_many([item[1] for item in items], [item[2] for item in items],
+                                               ids=[item[0] for item in items])
+            except Exception as e:
+                stored = [{"error": str(e)} for _ in items]
+            for i, result in zip(positions, stored):
+                results[i] = result
+        return results
+
+    def _compact(self) -> None:
+        """Queue drained: rewrite the journal down to the failed writes (if any)."""
+        with self._journal_lock:
+            if not self._retry:
+                self.journal_path.unlink(missing_ok=True)
+                return
+            tmp = self.journal_path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for item in self._retry:
+                    f.write(json.dumps(self._add_record(item), ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued write is committed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue) + self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue statistics."""
+        return {
+            "pending": self.pending(),
+            "max_pending": self.max_pending,
+            "committed": self.committed,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "awaiting_retry": len(self._retry),
+            "last_error": self.last_error,
+        }
+
+
+# ============================================================================
+# GLOBAL INSTANCE
+# ============================================================================
+
+def _default_journal() -> str:
+    """Journal under CHROMA_DB_PATH; one left at the old default is still replayed first."""
+    legacy = "./nexus_memory_journal.jsonl"
+    return legacy if os.path.exists(legacy) else os.path.join(vector_memory.path, "write_journal.jsonl")
+
+
+# Opt-in: MEMORY_WRITE_BEHIND=true makes memory_store return before the write commits
+write_behind: Optional[WriteBehindQueue] = None
+if env_bool("MEMORY_WRITE_BEHIND", False):
+    write_behind = WriteBehindQueue(
+        vector_memory,
+        journal_path=os.getenv("MEMORY_WRITE_JOURNAL") or _default_journal(),
+        max_pending=env_int("MEMORY_WRITE_QUEUE_SIZE", 1000),
+        linger=env_float("MEMORY_WRITE_LINGER", 0.05),
+        namespaces=memory_namespaces,
+    )
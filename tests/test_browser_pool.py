@@ -0,0 +1,117 @@
+"""
+Browser pool leasing: contexts come back on errors and cancellation, and
+sessions never inherit a context used by an earlier caller.
+Runs against a stub browser (no Chromium needed).
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from browser_pool import BrowserPool, PoolConfig, PoolExhausted  # noqa: E402
+
+
+class StubContext:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class StubPool(BrowserPool):
+    """BrowserPool whose contexts are plain objects instead of Chromium contexts."""
+
+    def __init__(self, max_contexts: int = 2):
+        super().__init__(PoolConfig(max_contexts=max_contexts, prewarm=0, lean=False))
+        self.created = 0
+
+    async def start(self):
+        self._browser = object()
+
+    async def _new_slot(self, pin=None):
+        from browser_pool import PooledPage
+        self.created += 1
+        return PooledPage(StubContext(), page=f"page-{self.created}", pin=pin)
+
+
+class LeaseTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_release_on_exception(self):
+        pool = StubPool(max_contexts=2)
+        for _ in range(3):
+            with self.assertRaises(RuntimeError):
+                async with pool.lease():
+                    raise RuntimeError("goto failed")
+        self.assertEqual(pool.stats()["leased"], 0)
+        # The pool is still usable after more failures than it has contexts
+        async with pool.lease() as page:
+            self.assertTrue(page.startswith("page-"))
+
+    async def test_failed_lease_is_recycled(self):
+        pool = StubPool(max_contexts=1)
+        with self.assertRaises(RuntimeError):
+            async with pool.lease() as page:
+                failed_page = page
+                raise RuntimeError("boom")
+        self.assertEqual(pool.stats()["free"], 0)
+        async with pool.lease() as page:
+            self.assertNotEqual(page, failed_page)
+
+    async def test_release_on_cancellation(self):
+        pool = StubPool(max_contexts=1)
+        entered = asyncio.Event()
+
+        async def hang():
+            async with pool.lease():
+                entered.set()
+                await asyncio.sleep(3600)
+
+        task = asyncio.create_task(hang())
+        await entered.wait()
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(pool.stats()["leased"], 0)
+        async def lease_again():
+            async with pool.lease():
+                pass
+        await asyncio.wait_for(lease_again(), 1)
+
+    async def test_timeout_releases(self):
+        pool = StubPool(max_contexts=1)
+
+        async def slow():
+            async with pool.lease():
+                await asyncio.sleep(3600)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(slow(), 0.05)
+        self.assertEqual(pool.stats()["leased"], 0)
+
+    async def test_session_gets_fresh_context(self):
+        pool = StubPool(max_contexts=1)
+        async with pool.lease() as page:
+            used = page
+        self.assertEqual(pool.stats()["free"], 1)
+        async with pool.lease("agent-1") as page:
+            self.assertNotEqual(page, used)
+        stats = pool.stats()
+        self.assertEqual((stats["free"], stats["pinned"]), (0, 1))
+
+    async def test_anonymous_lease_when_sessions_hold_pool(self):
+        pool = StubPool(max_contexts=2)
+        await pool.open_session("default")
+        await pool.open_session("agent-1")
+        with self.assertRaises(PoolExhausted):
+            await asyncio.wait_for(pool.lease().__aenter__(), 1)
+        await pool.close_session("agent-1")
+        async with pool.lease() as page:
+            self.assertTrue(page.startswith("page-"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Diff-mode snapshots: changed lines between two readable extractions.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from dom_extraction import diff_snapshot, forget_snapshots  # noqa: E402
+
+
+class DiffSnapshotTest(unittest.TestCase):
+
+    def tearDown(self):
+        forget_snapshots("tab")
+
+    def test_first_read_has_no_baseline(self):
+        self.assertIsNone(diff_snapshot("tab", "main", "http://x/", "a"))
+
+    def test_unchanged(self):
+        diff_snapshot("tab", "main", "http://x/", "a\nb")
+        self.assertEqual(diff_snapshot("tab", "main", "http://x/", "a\nb"), [])
+
+    def test_lines_that_look_like_diff_headers(self):
+        diff_snapshot("tab", "main", "http://x/", "title\n-- old note\n++ x\n@@ kept")
+        changes = diff_snapshot("tab", "main", "http://x/", "title\n-- new note\n++ y\n@@ kept")
+        self.assertEqual(changes, ["- -- old note", "- ++ x", "+ -- new note", "+ ++ y"])
+
+    def test_other_page_resets_baseline(self):
+        diff_snapshot("tab", "main", "http://x/", "a")
+        self.assertIsNone(diff_snapshot("tab", "main", "http://y/", "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
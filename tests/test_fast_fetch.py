@@ -0,0 +1,65 @@
+"""
+Fast fetch body handling: the byte cap on streamed responses and skipping
+non-text content types. Uses httpx.MockTransport, so no network is needed.
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import httpx  # noqa: E402
+
+from fast_fetch import FastFetcher  # noqa: E402
+
+
+class ChunkedBody(httpx.AsyncByteStream):
+    """Response body served in chunks; records how many were read."""
+
+    def __init__(self, chunk: bytes, count: int):
+        self.chunk, self.count, self.sent = chunk, count, 0
+
+    async def __aiter__(self):
+        for _ in range(self.count):
+            self.sent += 1
+            yield self.chunk
+
+
+class FastFetchBodyTest(unittest.TestCase):
+
+    def fetch(self, content_type: str, body: ChunkedBody, max_bytes: int = 1000):
+        fetcher = FastFetcher(max_bytes=max_bytes)
+        fetcher._client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, headers={"content-type": content_type}, stream=body)))
+
+        async def run():
+            try:
+                return await fetcher.fetch("http://example.test/")
+            finally:
+                await fetcher.close()
+        return asyncio.run(run())
+
+    def test_body_capped_at_max_bytes(self):
+        body = ChunkedBody(b"x" * 100, 1000)
+        result = self.fetch("text/plain", body)
+        self.assertTrue(result["truncated"])
+        self.assertEqual(len(result["text"]), 1000)
+        self.assertLess(body.sent, 1000)
+
+    def test_small_html_parsed_whole(self):
+        result = self.fetch("text/html", ChunkedBody(b"<title>T</title><body><p>hello world</p></body>", 1))
+        self.assertEqual((result["title"], result["text"]), ("T", "hello world"))
+        self.assertNotIn("truncated", result)
+
+    def test_binary_content_not_read(self):
+        body = ChunkedBody(b"%PDF" * 256, 10)
+        result = self.fetch("application/pdf", body)
+        self.assertEqual(result["content_type"], "application/pdf")
+        self.assertNotIn("text", result)
+        self.assertEqual(body.sent, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
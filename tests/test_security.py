@@ -0,0 +1,42 @@
+"""
+Path confinement for tool-supplied file paths.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from security import confine_path, PathNotAllowed  # noqa: E402
+
+
+class ConfinePathTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp()).resolve()
+        (self.root / "docs").mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_inside_root(self):
+        self.assertEqual(confine_path("docs/a.txt", str(self.root)), self.root / "docs" / "a.txt")
+        self.assertEqual(confine_path(str(self.root / "a.txt"), str(self.root)), self.root / "a.txt")
+
+    def test_outside_root(self):
+        for path in ("/etc/passwd", "../outside.txt", "docs/../../outside.txt"):
+            with self.assertRaises(PathNotAllowed):
+                confine_path(path, str(self.root))
+
+    def test_symlink_out_of_root(self):
+        (self.root / "link").symlink_to("/etc")
+        with self.assertRaises(PathNotAllowed):
+            confine_path("link/passwd", str(self.root))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Vector memory storage: quantized store migration, dedup, side-index upkeep
+and the shared embedder. Uses precomputed vectors (import_entries) or a
+hash-based embedder, so no embedding model is loaded.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np  # noqa: E402
+
+from memory_retention import RetentionPolicy, compact  # noqa: E402
+from vector_memory import VectorMemory  # noqa: E402
+
+DIM = 8
+
+
+def entries(count: int, timestamp: float = 1000.0):
+    """ids, documents, metadatas, vectors for `count` distinct memories."""
+    rng = np.random.default_rng(0)
+    ids = [f"mem_{i}" for i in range(count)]
+    documents = [f"memory number {i}" for i in range(count)]
+    metadatas = [{"source": "test", "timestamp": timestamp + i} for i in range(count)]
+    return ids, documents, metadatas, rng.standard_normal((count, DIM)).astype(np.float32)
+
+
+class HashEmbedMemory(VectorMemory):
+    """VectorMemory with a hash-based embedder instead of the ONNX model."""
+
+    def embed(self, texts):
+        return [[b / 255 for b in hashlib.sha256(text.encode()).digest()[:DIM]] for text in texts]
+
+
+class QuantizedMigrationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def open(self, vector_store: str) -> VectorMemory:
+        # A new handle is what a server restart sees
+        memory = VectorMemory(path=self.path, cache=None, vector_store=vector_store)
+        memory.ensure()
+        return memory
+
+    def test_migrates_once_and_drops_source(self):
+        self.open("chroma").import_entries(*entries(5))
+        memory = self.open("int8")
+        self.assertEqual(memory.collection.count(), 5)
+        names = {getattr(c, "name", c) for c in memory.client.list_collections()}
+        self.assertNotIn("meganx_memories", names)
+
+    def test_empty_after_prune_stays_empty(self):
+        self.open("chroma").import_entries(*entries(5))
+        memory = self.open("int8")
+        report = compact(memory, RetentionPolicy(max_age_days=1, source_quotas={}, archive=False), dry_run=False)
+        self.assertEqual(report["total_after"], 0)
+        restarted = self.open("int8")
+        self.assertEqual(restarted.collection.count(), 0)
+        self.assertEqual(restarted.vectors.count(), 0)
+        self.assertEqual(restarted.recent(10), [])
+
+
+class IndexRebuildTest(unittest.TestCase):
+
+    def test_missing_indexes_are_rebuilt(self):
+        path = tempfile.mkdtemp()
+        try:
+            VectorMemory(path=path, cache=None).import_entries(*entries(5))
+            for name in ("keywords", "metadata"):
+                os.remove(os.path.join(path, f"meganx_memories_{name}.sqlite3"))
+            memory = VectorMemory(path=path, cache=None)
+            self.assertEqual([entry["id"] for entry in memory.recent(2)], ["mem_4", "mem_3"])
+            self.assertEqual(memory.recall("number 3", 1, "keyword"), ["memory number 3"])
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class DedupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_repeat_in_one_call_merges_metadata(self):
+        memory = HashEmbedMemory(path=self.path, cache=None)
+        items = memory.store_many(["same", "same"], [{"source": "s1"}, {"source": "s2", "session": "x"}])
+        self.assertEqual(items[1], {"id": items[0]["id"], "duplicate": True})
+        metadata = memory.get([items[0]["id"]])[0]["metadata"]
+        self.assertEqual((metadata["source"], metadata["session"]), ("s2", "x"))
+        self.assertEqual(memory.collection.count(), 1)
+
+    def test_hash_backfilled_for_older_memories(self):
+        import chromadb
+        legacy = chromadb.PersistentClient(path=self.path).get_or_create_collection("meganx_memories")
+        legacy.add(ids=["old_1"], documents=["stored before dedup"], metadatas=[{"source": "old"}],
+                   embeddings=HashEmbedMemory.embed(None, ["stored before dedup"]))
+        memory = HashEmbedMemory(path=self.path, cache=None)
+        item = memory.store_many(["stored before dedup"])[0]
+        self.assertEqual(item, {"id": "old_1", "duplicate": True})
+        self.assertEqual(memory.collection.count(), 1)
+
+
+class SharedEmbedderTest(unittest.TestCase):
+
+    def test_handles_share_one_embedder(self):
+        path = tempfile.mkdtemp()
+        try:
+            handles = [VectorMemory(path=path, collection_name=f"meganx_memories__t{i}", cache=None) for i in range(3)]
+            for memory in handles:
+                memory.ensure()
+            self.assertEqual(len({id(memory.embedding_function) for memory in handles}), 1)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
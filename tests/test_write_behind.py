@@ -0,0 +1,91 @@
+"""
+Write-behind queue: journal replay after a crash, backpressure and
+enqueue-time dedup. Runs against a real Chroma store with a stub embedder.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from vector_memory import VectorMemory  # noqa: E402
+from write_behind import WriteBehindQueue, QueueFull  # noqa: E402
+
+
+class StubMemory(VectorMemory):
+    """VectorMemory with a hash-based embedder; store_many waits while `gate` is closed."""
+
+    def __init__(self, path: str):
+        super().__init__(path=path, cache=None, vector_store="chroma")
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def embed(self, texts):
+        return [[b / 255 for b in hashlib.sha256(text.encode()).digest()[:8]] for text in texts]
+
+    def store_many(self, *args, **kwargs):
+        self.gate.wait()
+        return super().store_many(*args, **kwargs)
+
+
+class WriteBehindTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.stuck = []
+
+    def tearDown(self):
+        # Let workers of "crashed" queues finish before the store goes away
+        for queue in self.stuck:
+            queue.memory.gate.set()
+            queue.flush(10)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def queue(self, **kwargs) -> WriteBehindQueue:
+        return WriteBehindQueue(StubMemory(self.path), linger=0, **kwargs)
+
+    def test_replay_after_crash(self):
+        crashed = self.queue()
+        crashed.memory.gate.clear()  # the worker never commits: the process "dies" here
+        self.stuck.append(crashed)
+        ids = [crashed.enqueue("first write"), crashed.enqueue("second write")]
+
+        restarted = self.queue()
+        self.assertEqual(restarted.start(), 2)
+        self.assertTrue(restarted.flush(10))
+        stored = restarted.memory.get(ids)
+        self.assertEqual([entry["document"] for entry in stored], ["first write", "second write"])
+        self.assertFalse(restarted.journal_path.exists())
+
+    def test_backpressure(self):
+        queue = self.queue(max_pending=2)
+        queue.memory.gate.clear()
+        queue.enqueue("one")
+        queue.enqueue("two")
+        with self.assertRaises(QueueFull):
+            queue.enqueue("three", timeout=0.1)
+        queue.memory.gate.set()
+        queue.enqueue("three", timeout=10)
+        self.assertTrue(queue.flush(10))
+        self.assertEqual(queue.stats()["committed"], 3)
+
+    def test_duplicate_returns_existing_id(self):
+        queue = self.queue()
+        queued = queue.enqueue("same content")
+        self.assertEqual(queue.enqueue("same content"), queued)
+        self.assertTrue(queue.flush(10))
+        self.assertEqual(queue.enqueue("same content", {"source": "again"}), queued)
+        self.assertTrue(queue.flush(10))
+        stored = queue.memory.get([queued])
+        self.assertEqual([entry["id"] for entry in stored], [queued])
+        self.assertEqual(stored[0]["metadata"]["source"], "again")
+        self.assertEqual(queue.memory.collection.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+MEGANX QUANTIZED STORE BENCHMARK
+Mede recall@k e memoria economizada do QuantizedVectorStore (int8 / float16)
+contra busca exata em float32.
+
+Uso:
+    python tools/bench_quantized.py                       # dados sinteticos (clusters, 384 dims)
+    python tools/bench_quantized.py --n 200000 --k 10
+    python tools/bench_quantized.py --from-chroma ./nexus_memory   # vetores reais da memoria
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from quantized_store import QuantizedVectorStore, QUANTIZED_DTYPES  # noqa: E402
+
+
+def synthetic(n, dim, clusters, rng):
+    """Clustered unit vectors: closer to real sentence embeddings than pure noise."""
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def from_chroma(path, collection):
+    import chromadb
+    col = chromadb.PersistentClient(path=path).get_collection(collection)
+    vectors = col.get(include=["embeddings"])["embeddings"]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50000, help="vetores sinteticos")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--from-chroma", metavar="PATH", help="usa os embeddings de uma memoria existente")
+    parser.add_argument("--collection", default="meganx_memories")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    data = from_chroma(args.from_chroma, args.collection) if args.from_chroma else synthetic(args.n, args.dim, args.clusters, rng)
+    n, dim = data.shape
+    # Queries: perturbed stored vectors, like a rephrased question about a known fact
+    picks = rng.integers(0, n, args.queries)
+    queries = data[picks] + 0.025 * rng.standard_normal((args.queries, dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    started = time.perf_counter()
+    truth = [set(np.argsort(-(data @ q))[:args.k]) for q in queries]
+    exact_ms = (time.perf_counter() - started) * 1000 / args.queries
+
+    print("=" * 72)
+    print(f" {n} vetores x {dim} dims, {args.queries} queries, recall@{args.k}")
+    print(f" float32 exato (numpy): {n * dim * 4 / 2**20:.1f} MB, {exact_ms:.2f} ms/query")
+    print("=" * 72)
+    print(f"{'store':<10} {'rerank':<7} {'recall@k':>9} {'ms/query':>9} {'scan MB':>8} {'saved':>7}")
+
+    ids = [str(i) for i in range(n)]
+    for dtype in QUANTIZED_DTYPES:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(tmp, dtype)
+            for start in range(0, n, 10000):
+                store.add(ids[start:start + 10000], data[start:start + 10000])
+            stats = store.stats()
+            for rerank in (False, True):
+                started = time.perf_counter()
+                hits = [store.search(q, args.k, rerank=rerank) for q in queries]
+                ms = (time.perf_counter() - started) * 1000 / args.queries
+                recall = np.mean([len({int(i) for i, _ in h} & t) / args.k for h, t in zip(hits, truth)])
+                print(f"{dtype:<10} {'sim' if rerank else 'nao':<7} {recall:>9.3f} {ms:>9.2f} "
+                      f"{stats['scan_bytes'] / 2**20:>8.1f} {stats['saved_ratio']:>7.1%}")
+            del store
+
+
+if __name__ == "__main__":
+    main()